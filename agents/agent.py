@@ -0,0 +1,124 @@
+from operator import attrgetter
+
+
+def column(name, doc=None):
+    """Attribute of the agent stored in a column of the AgentStore"""
+    array = attrgetter('store.' + name)
+
+    def get(self):
+        return array(self).item(self.id)
+
+    def set(self, value):
+        array(self)[self.id] = value
+    return property(get, set, doc=doc)
+
+
+class Agent:
+    """
+    This class represent the general citizen of the model.
+    Agents have the following variables:
+    (a) fixed: id, gender, month of birth, qualification, family_id
+    (b) variable: age, money (amount owned at any given moment), saving,
+    firm_id, utility, address, distance, region_id.
+
+    Agents are rows of the AgentStore. This is a view on one row, and the row is the agent's id.
+    Create agents with AgentStore.create.
+    """
+    __slots__ = ('store', 'id')
+
+    # Class for Agents. Citizens of the model
+    # Agents live in families, work in firms, consume
+    def __init__(self, store, id):
+        self.store = store
+        self.id = id
+
+    age = column('age')
+    month = column('month', 'Birthday month')
+    qualification = column('qualification')
+    money = column('money')
+    distance = column('distance')
+    p_marriage = column('p_marriage')
+    has_car = column('has_car')
+
+    @property
+    def gender(self):
+        return self.store.GENDERS[self.store.gender.item(self.id)]
+
+    @property
+    def last_wage(self):
+        wage = self.store.last_wage.item(self.id)
+        return None if wage != wage else wage
+
+    @last_wage.setter
+    def last_wage(self, wage):
+        self.store.last_wage[self.id] = float('nan') if wage is None else wage
+
+    @property
+    def firm_id(self):
+        code = self.store.firm.item(self.id)
+        return None if code < 0 else self.store.firm_ids[code]
+
+    @firm_id.setter
+    def firm_id(self, firm_id):
+        self.store.firm[self.id] = self.store.firm_code(firm_id)
+        self.store.update_unemployed(self.id)
+
+    @property
+    def family(self):
+        code = self.store.family.item(self.id)
+        return None if code < 0 else self.store.families[code]
+
+    @family.setter
+    def family(self, family):
+        self.store.family[self.id] = self.store.family_code(family)
+        self.store.relocate(self.id)
+
+    @property
+    def address(self):
+        return self.family.address
+
+    @property
+    def region_id(self):
+        return self.family.region_id
+
+    @property
+    def is_minor(self):
+        return self.age < 16
+
+    @property
+    def is_retired(self):
+        return self.age > 70
+
+    def grab_money(self):
+        money = self.store.money
+        d = money.item(self.id)
+        money[self.id] = 0
+        return d
+
+    @property
+    def belongs_to_family(self):
+        return self.family is not None
+
+    @property
+    def is_employed(self):
+        return self.firm_id is not None
+
+    @property
+    def is_employable(self):
+        return not self.is_retired \
+            and not self.is_minor \
+            and not self.is_employed
+
+    def set_commute(self, firm):
+        """Set (cache) commute according to their employer firm"""
+        if firm is not None:
+            self.distance = self.distance_to_firm(firm)
+        else:
+            self.distance = 0
+
+    def __repr__(self):
+        return 'Ag. ID: %s, %s, Qual. %s, Age: %s, Money $ %.2f, Firm: %s, Util. %.2f' % \
+               (self.id, self.gender, self.qualification, self.age, self.money, self.firm_id, self.utility)
+
+    def distance_to_firm(self, firm):
+        return self.family.house.distance_to_firm(firm)
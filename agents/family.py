@@ -1,4 +1,5 @@
 import datetime
+from collections import deque
 
 
 class Family:
@@ -28,7 +29,11 @@ class Family:
         self.rent_default = 0
         self.rent_voucher = 0
         self.average_utility = 0
-        self.last_permanent_income = list()
+        # Running sum and count of the family's monthly permanent incomes and, if averaged over a window,
+        # the incomes in it
+        self.income_sum = 0
+        self.income_count = 0
+        self.last_incomes = None
 
         # Previous region id
         if house is not None:
@@ -50,6 +55,8 @@ class Family:
             self.house = house
             house.family_id = self.id
             self.region_id = house.region_id
+            for member in self.members.values():
+                member.store.relocate(member.id)
         else:
             raise Exception
 
@@ -104,16 +111,27 @@ class Family:
         return sum(member.last_wage for member in self.members.values() if member.last_wage is not None)
 
     def get_permanent_income(self):
-        return sum(self.last_permanent_income) / len(self.last_permanent_income) if self.last_permanent_income else 0
+        return self.income_sum / self.income_count if self.income_count else 0
 
-    def permanent_income(self, bank, r):
+    def permanent_income(self, bank, r, window=None):
         # Equals Consumption (Bielefeld, 2018, pp.13-14)
         # Using last wage available as base for permanent income calculus: total_wage = Human Capital
         t0 = self.total_wage()
         r_1_r = r/(1 + r)
         # Calculated as "discounted sum of current income and expected future income" plus "financial wealth"
         # Perpetuity of income is a fraction (r_1_r) of income t0 divided by interest r
-        self.last_permanent_income.append(r_1_r * t0 + r_1_r * (t0 / r) + self.get_wealth(bank) * r)
+        income = r_1_r * t0 + r_1_r * (t0 / r) + self.get_wealth(bank) * r
+        self.income_sum += income
+        self.income_count += 1
+        # Average of the last `window` months only (PERMANENT_INCOME_WINDOW), counted from when it is set
+        if window:
+            if self.last_incomes is None:
+                self.last_incomes = deque()
+                self.income_sum, self.income_count = income, 1
+            self.last_incomes.append(income)
+            if len(self.last_incomes) > window:
+                self.income_sum -= self.last_incomes.popleft()
+                self.income_count -= 1
         return self.get_permanent_income()
 
     def prop_employed(self):
@@ -122,10 +140,10 @@ class Family:
         return len([m for m in employable if m.firm_id is None])/len(employable) if employable else 0
 
     # Consumption ####################################################################################################
-    def to_consume(self, central, r, year, month):
+    def to_consume(self, central, r, year, month, window=None):
         """Grabs all money from all members"""
         money = sum(m.grab_money() for m in self.members.values())
-        permanent_income = self.permanent_income(central, r)
+        permanent_income = self.permanent_income(central, r, window)
         # Having loans will impact on a lower long-run permanent income consumption and on a monthly strongly
         # reduction of consumption. However, the price of the house may be appreciating in the market.
         # If cash at hand is positive consume it capped to permanent income
@@ -155,36 +173,6 @@ class Family:
                     money_to_spend = cash
         return money_to_spend
 
-    def consume(self, firms, central, regions, params, seed, year, month):
-        """Family consumes its permanent income, based on members wages, working life expectancy
-        and real estate and savings real interest
-        """
-        money_to_spend = self.to_consume(central, central.interest, year, month)
-        # Decision on how much money to consume or save
-
-        if money_to_spend is not None:
-            # Picks SIZE_MARKET number of firms at seed and choose the closest or the cheapest
-            # Consumes from each product the chosen firm offers
-            market = seed.sample(firms, min(len(firms), int(params['SIZE_MARKET'])))
-            market = [firm for firm in market if firm.total_quantity > 0]
-            if market:
-                # Choose between cheapest or closest
-                firm_strategy = seed.choice(['Price', 'Distance'])
-
-                if firm_strategy == 'Price':
-                    # Choose firm with cheapest average prices
-                    chosen_firm = min(market, key=lambda firm: firm.prices)
-                else:
-                    # Choose closest firm
-                    chosen_firm = min(market, key=lambda firm: self.house.distance_to_firm(firm))
-
-                # Buy from chosen company
-                change = chosen_firm.sale(money_to_spend, regions, params['TAX_CONSUMPTION'])
-                self.savings += change
-
-                # Update family utility
-                self.average_utility = money_to_spend - change
-
     @property
     def agents(self):
         return list(self.members.values())
@@ -1,16 +1,44 @@
+import datetime
 from enum import Enum
 from math import e
 
+import numpy as np
+
 
 class Owner(Enum):
     FAMILY = 0
     FIRM = 1
 
 
+def column(name):
+    """Attribute kept in the arrays of the HouseRegistry, once the house is in it, or in the house until then"""
+    local = '_' + name
+
+    def get(self):
+        if self.registry is None:
+            return getattr(self, local)
+        return getattr(self.registry, name).item(self.row)
+
+    def set(self, value):
+        if self.registry is None:
+            setattr(self, local, value)
+        else:
+            getattr(self.registry, name)[self.row] = value
+    return property(get, set)
+
+
 class House:
     """Holds the fixed households.
     They may have changing owners and changing occupancy."""
     Owner = Owner
+    # HouseRegistry of the simulation and row of the house in it, once the house is in it
+    registry = None
+    row = None
+
+    size = column('size')
+    quality = column('quality')
+    price = column('price')
+    on_market = column('on_market')
 
     def __init__(self, _id, address, size, price, region_id, quality, family_id=None, owner_id=None,
                  owner_type=Owner.FAMILY):
@@ -26,18 +54,54 @@ class House:
         self.owner_type = owner_type
         self.rent_data = None
         self.on_market = 0
-        # Cache firm distances, since houses never change address
-        self._firm_distances = {}
 
-    def update_price(self, regions, k, bound, neighborhood, value):
-        """Compute new price for the house"""
-        self.price = self.size * self.quality * regions[self.region_id].index
-        # Update for too long in the market
-        self.price *= (1 - bound) * e ** (k * self.on_market) + bound
-        if neighborhood:
-            # If neighborhood is 0 (False), price is unchanged.
-            # If 1 (True) or higher, neighborhood effect is the value multiplier which increasingly impacts prices
-            self.price *= (1 + value * neighborhood[self.region_id])
+    @property
+    def family_id(self):
+        """Occupant"""
+        return self._family_id
+
+    @family_id.setter
+    def family_id(self, family_id):
+        if self.registry is not None:
+            self.registry.move(self.registry.by_family, self, self._family_id, family_id)
+            self.registry.family[self.row] = self.registry.code(family_id)
+            if family_id is not None:
+                self.registry.delist(self)
+        self._family_id = family_id
+        if self.registry is not None:
+            self.registry.update_vacancy(self)
+
+    @property
+    def owner_id(self):
+        return self._owner_id
+
+    @owner_id.setter
+    def owner_id(self, owner_id):
+        if self.registry is not None:
+            self.registry.move(self.registry.by_owner, self, self._owner_id, owner_id)
+            self.registry.owner[self.row] = self.registry.code(owner_id)
+            if owner_id != self._owner_id:
+                self.registry.delist(self)
+        self._owner_id = owner_id
+
+    @property
+    def rent_data(self):
+        """(rent, day it was agreed) or None, if not rented"""
+        if self.registry is None:
+            return self._rent_data
+        rent = self.registry.rent.item(self.row)
+        if np.isnan(rent):
+            return None
+        return rent, datetime.date.fromordinal(self.registry.rent_day.item(self.row))
+
+    @rent_data.setter
+    def rent_data(self, rent_data):
+        if self.registry is None:
+            self._rent_data = rent_data
+        else:
+            rent, day = rent_data if rent_data is not None else (np.nan, None)
+            self.registry.rent[self.row] = rent
+            self.registry.rent_day[self.row] = day.toordinal() if day is not None else 0
 
     def empty(self):
         """Remove current family"""
@@ -73,9 +137,9 @@ class House:
                                                                                           self.price, self.region_id)
 
     def distance_to_firm(self, firm):
-        if firm.id not in self._firm_distances:
-            self._firm_distances[firm.id] = self.calculate_distance(firm.address)
-        return self._firm_distances[firm.id]
+        if self.registry is None or self.registry.distances is None:
+            return self.calculate_distance(firm.address)
+        return self.registry.distances.between(self, firm)
 
     def calculate_distance(self, address):
         return self.address.distance(address)
@@ -90,3 +154,184 @@ class House:
             self.owner_type = Owner.FAMILY
         else:
             self.owner_type = Owner.FIRM
+        if self.registry is not None:
+            self.registry.update_vacancy(self)
+
+
+class HouseRegistry:
+    """
+    Houses of the simulation (sim.houses), as a dict by id, in order of creation.
+    Their data is kept in one NumPy array per attribute (struct of arrays), by row, which is the order
+    of creation, so that operations over all houses, such as monthly repricing, are array operations.
+    Regions, families and firms are indices into `region_ids` and `ids` (-1 for none).
+    The coordinates of the addresses give the distances to firms (world.distances.Distances).
+    It also indexes the houses owned by each family or firm and the house each family lives in,
+    so that they are found without a scan. Houses keep the indexes up to date as their
+    owner_id or family_id change. Once attached to the housing market, they also leave its
+    listings when occupied or sold, and join or leave its vacancies for rent.
+    """
+    # dtype and value of empty rows. Rent is NaN and rent_day (an ordinal date) 0 if not rented
+    COLUMNS = {
+        'size': (np.int32, 0),
+        'quality': (np.int32, 0),
+        'price': (np.float64, 0),
+        'on_market': (np.int32, 0),
+        'region': (np.int32, -1),
+        'family': (np.int32, -1),
+        'owner': (np.int32, -1),
+        'rent': (np.float64, np.nan),
+        'rent_day': (np.int32, 0),
+        'x': (np.float64, 0),
+        'y': (np.float64, 0)
+    }
+
+    def __init__(self, houses=None, capacity=1024):
+        self.n = 0
+        for name, (dtype, empty) in self.COLUMNS.items():
+            setattr(self, name, np.full(capacity, empty, dtype=dtype))
+        self.houses = {}
+        self.views = []
+        self.region_ids, self.region_codes = [], {}
+        self.ids, self.codes = [], {}
+        # world.distances.Distances of the simulation, if any
+        self.distances = None
+        self.listings = None
+        self.vacancies = None
+        # owner_id -> {house id: house}, family_id -> {house id: house}
+        self.by_owner = {}
+        self.by_family = {}
+        for house in (houses or {}).values():
+            self[house.id] = house
+
+    def grow(self):
+        """Double the capacity of all columns"""
+        for name, (dtype, empty) in self.COLUMNS.items():
+            old = getattr(self, name)
+            new = np.full(2 * len(old), empty, dtype=dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def region_code(self, region_id):
+        if region_id not in self.region_codes:
+            self.region_codes[region_id] = len(self.region_ids)
+            self.region_ids.append(region_id)
+        return self.region_codes[region_id]
+
+    def code(self, _id):
+        """Index of a family or firm id"""
+        if _id is None:
+            return -1
+        if _id not in self.codes:
+            self.codes[_id] = len(self.ids)
+            self.ids.append(_id)
+        return self.codes[_id]
+
+    def column(self, name):
+        """Values of all houses, in order of creation"""
+        return getattr(self, name)[:self.n]
+
+    def select(self, mask):
+        """Houses of the rows where `mask` is true"""
+        return [self.views[r] for r in np.flatnonzero(mask).tolist()]
+
+    def vacant(self):
+        return self.select(self.column('family') < 0)
+
+    def rented(self):
+        return self.select(~np.isnan(self.column('rent')))
+
+    def update_prices(self, regions, k, bound, neighborhood, value):
+        """Compute new prices for all houses, given the index of their regions, the months they have been
+        on the market and, if any, the relative wealth of their neighborhood (region)"""
+        region = self.column('region')
+        index = np.array([regions[r].index for r in self.region_ids], dtype=np.float64)
+        price = self.column('size') * self.column('quality') * index[region]
+        # Update for too long in the market
+        price *= (1 - bound) * e ** (k * self.column('on_market')) + bound
+        if neighborhood:
+            # If neighborhood is 0 (False), price is unchanged.
+            # If 1 (True) or higher, neighborhood effect is the value multiplier which increasingly impacts prices
+            wealth = np.array([neighborhood[r] for r in self.region_ids], dtype=np.float64)
+            price *= (1 + value * wealth[region])
+        self.price[:self.n] = price
+
+    @staticmethod
+    def move(index, house, old, new):
+        if old is not None:
+            houses = index[old]
+            del houses[house.id]
+            if not houses:
+                del index[old]
+        if new is not None:
+            index.setdefault(new, {})[house.id] = house
+
+    def attach(self, listings, vacancies):
+        """Keep the listings (ListingBook) and vacancies (VacancyPool) of the housing market up to date"""
+        self.listings = listings
+        self.vacancies = vacancies
+        for house in self.houses.values():
+            vacancies.update(house)
+
+    def delist(self, house):
+        if self.listings is not None:
+            self.listings.discard(house)
+
+    def update_vacancy(self, house):
+        if self.vacancies is not None:
+            self.vacancies.update(house)
+
+    def owned_by(self, owner_id):
+        """Houses of the family or firm, in order of creation"""
+        return sorted(self.by_owner.get(owner_id, {}).values(), key=lambda h: h.row)
+
+    def occupied_by(self, family_id):
+        """Houses the family lives in (one, if any)"""
+        return sorted(self.by_family.get(family_id, {}).values(), key=lambda h: h.row)
+
+    def __setitem__(self, id, house):
+        assert house.id == id and house.registry is None
+        if self.n == len(self.price):
+            self.grow()
+        row = self.n
+        self.n += 1
+        # Move the data of the house into the arrays
+        values = {name: getattr(house, name) for name in ('size', 'quality', 'price', 'on_market', 'rent_data')}
+        for name in values:
+            del house.__dict__['_' + name]
+        house.row = row
+        house.registry = self
+        for name, value in values.items():
+            setattr(house, name, value)
+        self.region[row] = self.region_code(house.region_id)
+        self.x[row], self.y[row] = house.address.x, house.address.y
+        self.family[row] = self.code(house.family_id)
+        self.owner[row] = self.code(house.owner_id)
+        self.houses[id] = house
+        self.views.append(house)
+        self.move(self.by_owner, house, None, house.owner_id)
+        self.move(self.by_family, house, None, house.family_id)
+        self.update_vacancy(house)
+
+    def __getitem__(self, id):
+        return self.houses[id]
+
+    def __contains__(self, id):
+        return id in self.houses
+
+    def __len__(self):
+        return len(self.houses)
+
+    def __iter__(self):
+        return iter(self.houses)
+
+    def get(self, id, default=None):
+        return self.houses.get(id, default)
+
+    def keys(self):
+        return self.houses.keys()
+
+    def values(self):
+        return self.houses.values()
+
+    def items(self):
+        return self.houses.items()
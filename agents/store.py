@@ -0,0 +1,240 @@
+import numpy as np
+
+from world.population import marriage_data
+from .agent import Agent
+
+
+class AgentStore:
+    """
+    Table of all agents, with one NumPy array per attribute (struct of arrays), so that operations over
+    the whole population are array operations instead of loops over objects.
+    Rows are never reused: the row is the agent id, and agents that die keep their data (see sim.grave).
+    The store also works as the dict of agents in the simulation (sim.agents), by id, in order of creation.
+    Agents only belong to it once added, e.g. sim.agents[agent.id] = agent.
+
+    Agents in the simulation are indexed by (state, birth month), then by age, so that each month's
+    birthdays are found without a scan. The state is the number of the state of the family's region
+    (-1 for agents without one), kept up to date as agents change families and families move.
+    The store also keeps the pool of unemployed agents of working age, as they are added or removed,
+    hired or fired and age.
+    """
+    GENDERS = ['male', 'female']
+    # Agents look for jobs if older than the first and younger than the last
+    WORKING_AGES = (16, 70)
+
+    # dtype and value of empty rows. Firms and families are indices into `firm_ids` and `families`, -1 for none
+    COLUMNS = {
+        'age': (np.int16, 0),
+        'gender': (np.int8, 0),
+        'month': (np.int8, 0),
+        'qualification': (np.int16, 0),
+        'money': (np.float64, 0),
+        'firm': (np.int32, -1),
+        'family': (np.int32, -1),
+        'last_wage': (np.float64, np.nan),
+        'distance': (np.float64, 0),
+        'p_marriage': (np.float64, 0),
+        'has_car': (np.bool_, False),
+        'state': (np.int16, -1),
+        'active': (np.bool_, False)
+    }
+
+    def __init__(self, capacity=1024):
+        self.n = 0
+        self.n_active = 0
+        for name, (dtype, empty) in self.COLUMNS.items():
+            setattr(self, name, np.full(capacity, empty, dtype=dtype))
+        self.views = []
+        self.firm_ids, self.firm_codes = [], {}
+        self.families, self.family_codes = [], {}
+        # (state, month) -> {age: set of rows}
+        self.birthdays = {}
+        # Rows of the unemployed agents in the simulation, of working age
+        self.unemployed = set()
+
+    def create(self, gender, age, qualification, money, month, firm_id=None, family=None, distance=0):
+        """New agent. It is not in the simulation until added to the store"""
+        if self.n == len(self.active):
+            self.grow()
+        row = self.n
+        self.n += 1
+        self.gender[row] = self.GENDERS.index(gender)
+        self.age[row] = age
+        self.qualification[row] = qualification
+        self.money[row] = money
+        self.month[row] = month
+        self.firm[row] = self.firm_code(firm_id)
+        self.family[row] = self.family_code(family)
+        self.distance[row] = distance
+        agent = Agent(self, row)
+        agent.p_marriage = marriage_data.p_marriage(agent)
+        self.views.append(agent)
+        return agent
+
+    def create_many(self, genders, ages, qualifications, money, months):
+        """New agents, one for each value of the arrays. As create, they are not in the simulation until added"""
+        n = len(ages)
+        while self.n + n > len(self.active):
+            self.grow()
+        rows = np.arange(self.n, self.n + n)
+        self.n += n
+        self.gender[rows] = [self.GENDERS.index(g) for g in genders]
+        self.age[rows] = ages
+        self.qualification[rows] = qualifications
+        self.money[rows] = money
+        self.month[rows] = months
+        self.p_marriage[rows] = marriage_data.p_marriage_of(self.male(rows), self.age[rows])
+        agents = [Agent(self, row) for row in rows.tolist()]
+        self.views.extend(agents)
+        return agents
+
+    def grow(self):
+        """Double the capacity of all columns"""
+        for name, (dtype, empty) in self.COLUMNS.items():
+            old = getattr(self, name)
+            new = np.full(2 * len(old), empty, dtype=dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def firm_code(self, firm_id):
+        if firm_id is None:
+            return -1
+        if firm_id not in self.firm_codes:
+            self.firm_codes[firm_id] = len(self.firm_ids)
+            self.firm_ids.append(firm_id)
+        return self.firm_codes[firm_id]
+
+    def family_code(self, family):
+        if family is None:
+            return -1
+        if family.id not in self.family_codes:
+            self.family_codes[family.id] = len(self.families)
+            self.families.append(family)
+        return self.family_codes[family.id]
+
+    # Birthdays index ################################################################################################
+    def _state_of(self, row):
+        code = self.family.item(row)
+        region_id = None if code < 0 else self.families[code].region_id
+        return -1 if region_id is None else int(region_id[:2])
+
+    def _index(self, row):
+        state = self._state_of(row)
+        self.state[row] = state
+        ages = self.birthdays.setdefault((state, self.month.item(row)), {})
+        ages.setdefault(self.age.item(row), set()).add(row)
+
+    def _unindex(self, row):
+        ages = self.birthdays[(self.state.item(row), self.month.item(row))]
+        age = self.age.item(row)
+        ages[age].discard(row)
+        if not ages[age]:
+            del ages[age]
+
+    def relocate(self, row):
+        """Update the state of an agent, after a change of family or of the family's house"""
+        if self.active[row] and self._state_of(row) != self.state[row]:
+            self._unindex(row)
+            self._index(row)
+
+    def birthday(self, state, month):
+        """Agents of the state (number) that were born in the month turn one year older.
+        Returns their rows, in order"""
+        ages = self.birthdays.get((state, month), {})
+        rows = np.array(sorted(r for bucket in ages.values() for r in bucket), dtype=int)
+        self.age[rows] += 1
+        self.birthdays[(state, month)] = {age + 1: bucket for age, bucket in ages.items()}
+        for row in rows[np.isin(self.age[rows], [self.WORKING_AGES[0] + 1, self.WORKING_AGES[1]])].tolist():
+            self.update_unemployed(row)
+        return rows
+
+    # Unemployed pool ################################################################################################
+    def update_unemployed(self, row):
+        """Add or remove the agent from the unemployed pool, after a change of job, age or of being in the simulation"""
+        low, high = self.WORKING_AGES
+        if self.active[row] and self.firm[row] < 0 and low < self.age[row] < high:
+            self.unemployed.add(row)
+        else:
+            self.unemployed.discard(row)
+
+    def unemployed_rows(self):
+        """Rows of the unemployed pool, in order"""
+        return np.array(sorted(self.unemployed), dtype=int)
+
+    # Array operations ###############################################################################################
+    def column(self, name):
+        """Values of an attribute for every row created so far"""
+        return getattr(self, name)[:self.n]
+
+    def rows(self, mask=None):
+        """Ids of the agents in the simulation, in order, optionally where `mask` (over all rows) holds"""
+        active = self.column('active')
+        return np.flatnonzero(active if mask is None else active & mask)
+
+    def select(self, mask=None):
+        return [self.views[r] for r in self.rows(mask)]
+
+    def male(self, rows):
+        return self.gender[rows] == self.GENDERS.index('male')
+
+    def unemployment(self):
+        """Share of agents of working age that are not employed"""
+        low, high = self.WORKING_AGES
+        age = self.column('age')
+        employable = self.rows((low < age) & (age < high))
+        if not len(employable):
+            return 0
+        return np.count_nonzero(self.firm[employable] < 0) / len(employable)
+
+    def wage_deciles(self, seed, share=.5):
+        """Deciles of the last wages of a random `share` of the agents, drawn with NumPy generator `seed`.
+        None if none of them has earned yet"""
+        rows = self.rows()
+        wages = self.last_wage[rows[seed.random(len(rows)) < share]]
+        wages = wages[~np.isnan(wages)]
+        if not len(wages):
+            return None
+        return np.percentile(wages, np.arange(0, 100, 10))
+
+    # Dict of agents in the simulation ##############################################################################
+    def __getitem__(self, id):
+        try:
+            if id >= 0 and self.active[id]:
+                return self.views[id]
+        except (TypeError, IndexError):
+            pass
+        raise KeyError(id)
+
+    def __setitem__(self, id, agent):
+        assert agent.store is self and agent.id == id
+        if not self.active[id]:
+            self.active[id] = True
+            self.n_active += 1
+            self._index(id)
+            self.update_unemployed(id)
+
+    def __delitem__(self, id):
+        if id not in self:
+            raise KeyError(id)
+        self._unindex(id)
+        self.active[id] = False
+        self.n_active -= 1
+        self.unemployed.discard(id)
+
+    def __contains__(self, id):
+        return isinstance(id, (int, np.integer)) and 0 <= id < self.n and bool(self.active[id])
+
+    def __len__(self):
+        return self.n_active
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        return self.rows().tolist()
+
+    def values(self):
+        return self.select()
+
+    def items(self):
+        return [(r, self.views[r]) for r in self.keys()]
@@ -0,0 +1,128 @@
+"""
+Benchmark of the simulation over a fixed matrix of scales.
+Each case runs a synthetic world (see world/synthetic.py) for a fixed number of months
+with a fixed seed, in its own process, so that its peak memory is measured on its own.
+"""
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import time
+from collections import defaultdict
+
+from dateutil import relativedelta
+
+# Synthetic worlds, as conf.RUN['SYNTHETIC_WORLD'], from the size of a single municipality ACP to a large ACP
+WORLDS = {
+    'small': {'MUNICIPALITIES': 1, 'REGIONS_PER_MUNICIPALITY': 1, 'POPULATION': 200000},
+    'medium': {'MUNICIPALITIES': 4, 'REGIONS_PER_MUNICIPALITY': 4, 'POPULATION': 2000000},
+    'large': {'MUNICIPALITIES': 16, 'REGIONS_PER_MUNICIPALITY': 8, 'POPULATION': 20000000}
+}
+PERCENTAGES = [.005, .05]
+SEED = 0
+
+# Metrics compared against the baseline, and whether higher is better
+METRICS = {'months_per_second': True, 'peak_rss_mb': False, 'output_bytes': False}
+
+
+def case_name(world, percentage):
+    return '{}@{}'.format(world, percentage)
+
+
+def run_case(run_conf, params, world, percentage, months, path):
+    """Run one case of the matrix and measure it. Meant to run on a fresh process"""
+    import conf
+    conf.RUN.update(run_conf)
+    conf.RUN['SYNTHETIC_WORLD'] = dict(WORLDS[world], SEED=SEED)
+    conf.RUN['KEEP_RANDOM_SEED'] = False
+    conf.RUN['SEED'] = SEED
+    conf.RUN['FORCE_NEW_POPULATION'] = True
+    conf.RUN['PRINT_STATISTICS_AND_RESULTS_DURING_PROCESS'] = False
+    conf.RUN['CHECKPOINT_MONTHS'] = None
+    from simulation import Simulation
+
+    start = params['STARTING_DAY']
+    params = dict(params, PERCENTAGE_ACTUAL_POP=percentage,
+                  TOTAL_DAYS=(start + relativedelta.relativedelta(months=months) - start).days)
+
+    t0 = time.perf_counter()
+    sim = Simulation(params, path)
+    sim.initialize()
+    t1 = time.perf_counter()
+    sim.run()
+    t2 = time.perf_counter()
+
+    phases = defaultdict(float)
+    with open(sim.output.time_path, 'r') as f:
+        for line in f:
+            _, phase, seconds, _ = line.strip().split(';')
+            phases[phase] += float(seconds)
+
+    output_bytes = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+    return {
+        'name': case_name(world, percentage),
+        'world': world,
+        'percentage': percentage,
+        'agents': len(sim.agents),
+        'families': len(sim.families),
+        'houses': len(sim.houses),
+        'firms': len(sim.firms),
+        'months': months,
+        'init_seconds': t1 - t0,
+        'run_seconds': t2 - t1,
+        'months_per_second': months / (t2 - t1),
+        'phases': dict(sorted(phases.items(), key=lambda x: -x[1])),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'output_bytes': output_bytes
+    }
+
+
+def run(run_conf, params, output_dir, months, worlds=None, percentages=None):
+    """Run the matrix of cases, each on its own process, and return the report"""
+    worlds = worlds or list(WORLDS)
+    percentages = percentages or PERCENTAGES
+    cases = []
+    for world in worlds:
+        for percentage in percentages:
+            path = os.path.join(output_dir, case_name(world, percentage))
+            # A new process for each case, so that peak memory does not carry over
+            with multiprocessing.get_context('spawn').Pool(1) as pool:
+                cases.append(pool.apply(run_case, (run_conf, params, world, percentage, months, path)))
+    return {
+        'date': datetime.datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'months': months,
+        'seed': SEED,
+        'cases': cases
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Compare each case with the same case of the baseline.
+    Returns a list of (case, metric, baseline value, value, change, regression)"""
+    baseline_cases = {c['name']: c for c in baseline['cases']}
+    comparison = []
+    for case in report['cases']:
+        base = baseline_cases.get(case['name'])
+        if base is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            change = case[metric] / base[metric] - 1 if base[metric] else 0
+            regression = -change > tolerance if higher_is_better else change > tolerance
+            comparison.append((case['name'], metric, base[metric], case[metric], change, regression))
+    return comparison
+
+
+def save(report, fname):
+    with open(fname, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+def load(fname):
+    with open(fname, 'r') as f:
+        return json.load(f)
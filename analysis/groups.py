@@ -0,0 +1,61 @@
+"""
+Statistics by group (e.g. by region or municipality) computed in one pass over all items,
+instead of one scan of all items per group.
+"""
+import numpy as np
+
+
+class Groups:
+    """
+    Items grouped by key, e.g. families by region id. Items are sorted by key once (stably, so each group
+    keeps the order of the items) and each statistic is then one array operation over all groups.
+    Results are dicts by key, with only the keys that have items.
+    """
+    def __init__(self, keys):
+        keys = np.asarray(keys)
+        self.order = np.argsort(keys, kind='stable')
+        if len(keys):
+            self.keys, self.starts, self.counts = np.unique(keys[self.order], return_index=True, return_counts=True)
+        else:
+            self.keys, self.starts, self.counts = keys, np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        self.keys = self.keys.tolist()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def split(self, items):
+        """Lists of the items of each group, in their order"""
+        items = [items[i] for i in self.order.tolist()]
+        bounds = (self.starts + self.counts).tolist()
+        return {k: items[s:e] for k, s, e in zip(self.keys, self.starts.tolist(), bounds)}
+
+    def sum(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(self):
+            return {}
+        return dict(zip(self.keys, np.add.reduceat(values[self.order], self.starts).tolist()))
+
+    def _sorted(self, values):
+        """Values sorted within each group"""
+        values = np.asarray(values, dtype=np.float64)[self.order]
+        group = np.repeat(np.arange(len(self)), self.counts)
+        return values[np.lexsort((values, group))]
+
+    def median(self, values):
+        """Median of each group, as numpy.median"""
+        values = self._sorted(values)
+        low = values[self.starts + (self.counts - 1) // 2]
+        high = values[self.starts + self.counts // 2]
+        return dict(zip(self.keys, ((low + high) / 2).tolist()))
+
+    def quantile(self, values, q):
+        """Quantile q of each group, as numpy.quantile (linear interpolation)"""
+        values = self._sorted(values)
+        position = q * (self.counts - 1)
+        below = np.floor(position).astype(int)
+        t = position - below
+        a = values[self.starts + below]
+        b = values[self.starts + np.minimum(below + 1, self.counts - 1)]
+        # Interpolate from the closest end, as numpy does
+        result = np.where(t >= .5, b - (b - a) * (1 - t), a + (b - a) * t)
+        return dict(zip(self.keys, result.tolist()))
@@ -1,6 +1,8 @@
 import json
 import os
+import time
 from collections import defaultdict
+from contextlib import contextmanager
 
 import conf
 
@@ -84,6 +86,13 @@ OUTPUT_DATA_SPEC = {
                      'stocks', 'amount_produced', 'price', 'amount_sold',
                      'revenue', 'profit', 'wages_paid']
     },
+    'time': {
+        'avg': {
+            'groupings': ['month', 'phase'],
+            'columns': ['seconds', 'count']
+        },
+        'columns': ['month', 'phase', 'seconds', 'count']
+    },
     'regional': {
         'avg': {
             'groupings': ['month', 'mun_id'],
@@ -100,9 +109,9 @@ OUTPUT_DATA_SPEC = {
 class Output:
     """Manages simulation outputs"""
 
-    def __init__(self, sim, output_path):
-        files = ['stats', 'regional', 'time', 'firms', 'banks',
-                 'houses', 'agents', 'families', 'grave', 'construction']
+    def __init__(self, sim, output_path, reset=True):
+        self.files = ['stats', 'regional', 'time', 'firms', 'banks',
+                      'houses', 'agents', 'families', 'grave', 'construction']
 
         self.sim = sim
         self.times = []
@@ -112,12 +121,12 @@ class Output:
             os.makedirs(self.path)
             os.makedirs(self.transit_path)
 
-        for p in files:
+        for p in self.files:
             path = os.path.join(self.path, 'temp_{}.csv'.format(p))
             setattr(self, '{}_path'.format(p), path)
 
-            # reset files for each run
-            if os.path.exists(path):
+            # reset files for each run, unless resuming it
+            if reset and os.path.exists(path):
                 os.remove(path)
 
         self.save_name = '{}/{}_states_{}_acps_{}'.format(
@@ -126,6 +135,40 @@ class Output:
             '_'.join(sim.geo.states_on_process),
             '_'.join(sim.geo.processing_acps_codes))
 
+    def snapshot(self):
+        """Size of each output file, so a resumed run may drop whatever was written after the snapshot"""
+        sizes = {}
+        for p in self.files:
+            path = getattr(self, '{}_path'.format(p))
+            sizes[p] = os.path.getsize(path) if os.path.exists(path) else None
+        return {'sizes': sizes, 'times': list(self.times)}
+
+    def restore(self, snapshot):
+        for p, size in snapshot['sizes'].items():
+            path = getattr(self, '{}_path'.format(p))
+            if size is None:
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                # Output written so far must be there to continue appending to it
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+        self.times = snapshot['times']
+
+    @contextmanager
+    def timer(self, phase, count=0):
+        """Time a phase of the month. `count` is the number of entities it went through"""
+        start = time.perf_counter()
+        yield
+        self.times.append((phase, time.perf_counter() - start, count))
+
+    def save_time_report(self, sim):
+        """Write the time taken by each phase of the month"""
+        with open(self.time_path, 'a') as f:
+            [f.write('%s;%s;%.6f;%d\n' % (sim.clock.days, phase, seconds, count))
+             for phase, seconds, count in self.times]
+        self.times = []
+
     def save_stats_report(self, sim, bank_taxes):
         # Banks
         bank = sim.central
@@ -134,7 +177,7 @@ class Output:
         p_delinquent = len(bank.delinquent_loans()) / n_active if n_active else 0
         price_index, inflation = sim.stats.update_price(sim.firms)
         gdp_index, gdp_growth = sim.stats.sum_region_gdp(sim.firms, sim.regions)
-        unemployment = sim.stats.update_unemployment(sim.agents.values(), True)
+        unemployment = sim.stats.update_unemployment(sim.agents, True)
         average_workers = sim.stats.calculate_average_workers(sim.firms)
         families_median_wealth = sim.stats.calculate_families_median_wealth(sim.families)
         families_wealth, families_savings = sim.stats.calculate_families_wealth(sim.families)
@@ -194,12 +237,13 @@ class Output:
             mun_id = region.id[:7]
             municipalities[mun_id].append(region)
 
+        mun_gdp_firms = sim.stats.calculate_mun_GDP(sim.firms)
         for mun_id, regions in municipalities.items():
             mun_pop = sum(r.pop for r in regions)
             mun_gdp = sum(r.gdp for r in regions)
             mun_agents = agents_by_mun[mun_id]
             mun_families = families_by_mun[mun_id]
-            GDP_mun_capita = sim.stats.update_GDP_capita(sim.firms, mun_id, mun_pop)
+            GDP_mun_capita = sim.stats.update_GDP_capita(mun_gdp_firms, mun_id, mun_pop)
             commuting = sim.stats.update_commuting(mun_families)
             mun_gini = sim.stats.calculate_regional_GINI(mun_families)
             mun_house_values = sim.stats.calculate_avg_regional_house_price(mun_families)
@@ -3,6 +3,8 @@ import logging
 import numpy as np
 from collections import defaultdict
 
+from .groups import Groups
+
 logger = logging.getLogger('stats')
 
 if conf.RUN['PRINT_STATISTICS_AND_RESULTS_DURING_PROCESS']:
@@ -49,19 +51,11 @@ class Statistics(object):
         self.previous_month_price = average_price
         return average_price, inflation
 
-    def calculate_region_GDP(self, firms, region):
-        """GDP based on FIRMS' revenues"""
-        # Added value for all firms in a given period
-        region_GDP = np.sum([firms[firm].revenue for firm in firms.keys() if firms[firm].region_id
-                             == region.id])
-        region.gdp = region_GDP
-        return region_GDP
-
     def calculate_avg_regional_house_price(self, regional_families):
         return np.average([f.house.price for f in regional_families if f.num_members > 0])
 
     def calculate_house_vacancy(self, houses, log=True):
-        vacants = np.sum([1 for h in houses if houses[h].family_id is None])
+        vacants = np.sum(houses.column('family') < 0)
         num_houses = len(houses)
         if log:
             logger.info(f'Vacant houses {vacants:,.0f}')
@@ -69,10 +63,11 @@ class Statistics(object):
         return vacants / num_houses
 
     def calculate_house_price(self, houses):
-        return np.average([h.price for h in houses.values()])
+        return np.average(houses.column('price'))
 
     def calculate_rent_price(self, houses):
-        return np.average([h.rent_data[0] for h in houses.values() if h.rent_data is not None])
+        rents = houses.column('rent')
+        return np.average(rents[~np.isnan(rents)])
 
     def calculate_affordable_rent(self, families):
         affordable = np.sum([1 if family.is_renting
@@ -82,9 +77,12 @@ class Statistics(object):
         renting = np.sum([family.is_renting for family in families.values()])
         return affordable / renting
 
-    def update_GDP_capita(self, firms, mun_id, mun_pop):
-        dummy_gdp = np.sum([firms[firm].revenue for firm in firms.keys()
-                            if firms[firm].region_id[:7] == mun_id])
+    def calculate_mun_GDP(self, firms):
+        """GDP of each municipality, based on FIRMS' revenues"""
+        return Groups([f.region_id[:7] for f in firms.values()]).sum([f.revenue for f in firms.values()])
+
+    def update_GDP_capita(self, mun_gdp, mun_id, mun_pop):
+        dummy_gdp = mun_gdp.get(mun_id, 0)
         if mun_pop > 0:
             dummy_gdp_capita = dummy_gdp / mun_pop
         else:
@@ -92,8 +90,12 @@ class Statistics(object):
         return dummy_gdp_capita
 
     def update_unemployment(self, agents, global_u=False):
-        employable = [m for m in agents if 16 < m.age < 70]
-        temp = len([m for m in employable if m.firm_id is None])/len(employable) if employable else 0
+        if hasattr(agents, 'unemployment'):
+            # The whole AgentStore
+            temp = agents.unemployment()
+        else:
+            employable = [m for m in agents if 16 < m.age < 70]
+            temp = len([m for m in employable if m.firm_id is None])/len(employable) if employable else 0
         logger.info(f'Unemployment rate: {temp * 100:.2f}')
         if global_u:
             self.global_unemployment_rate = temp
@@ -185,10 +187,11 @@ class Statistics(object):
     def sum_region_gdp(self, firms, regions):
         gdp = 0
         _gdp = 0
+        revenues = Groups([f.region_id for f in firms.values()]).sum([f.revenue for f in firms.values()])
         for region in regions.values():
             _gdp += region.gdp
-            region_gdp = self.calculate_region_GDP(firms, region)
-            gdp += region_gdp
+            region.gdp = revenues.get(region.id, 0)
+            gdp += region.gdp
         if gdp == 0:
             gdp_growth = 1
         else:
@@ -18,6 +18,9 @@ MARKUP = 0.15
 STICKY_PRICES = .5
 # Number of firms consulted before consumption
 SIZE_MARKET = 10
+# Months of income families average into their permanent income, that caps consumption.
+# None to average all months since the family was created
+PERMANENT_INCOME_WINDOW = None
 
 # Frequency firms enter the market
 LABOR_MARKET = 0.75
@@ -86,6 +89,10 @@ MAX_OFFER_DISCOUNT = .6
 # Percentage of households pursuing new location
 PERCENTAGE_ENTERING_ESTATE_MARKET = 0.0045
 NEIGHBORHOOD_EFFECT = 3
+# How far families look for houses to buy or rent: 'region', 'municipality' or 'acp'.
+# They look in their own region first, widening up to the radius while there are fewer houses than they sample.
+# None to look at all houses of the run, wherever they are
+HOUSING_SEARCH_RADIUS = None
 
 # RENTAL
 RENTAL_SHARE = 0.3
@@ -131,6 +138,11 @@ WAGE_TO_CAR_OWNERSHIP_QUANTILES = [
 ]
 PRIVATE_TRANSIT_COST = 0.25
 PUBLIC_TRANSIT_COST = 0.05
+# Distances of commuting and shopping: 'points', between the addresses of houses and firms, or 'regions',
+# between their regions, taken from COMMUTE_MATRIX, a CSV file of the cost of travelling from each region (rows,
+# with ids in the first column) to each region (columns), or, if None, the distances between region centroids
+DISTANCES = 'points'
+COMMUTE_MATRIX = None
 
 # selecting the ACPs (Population Concentration Areas)
 # ACPs and their STATES - ALL ACPs written in UPPER CASE and without  ACCENT
@@ -65,3 +65,18 @@ LIMIT_SAVED_TRANSIT_REGIONS = None
 
 # Force generation of new population
 FORCE_NEW_POPULATION = False
+
+# Consistency checks of the simulation state (see world/invariants.py).
+# 'off' for none, 'cheap' for the inexpensive ones, 'full' for all of them, including money conservation,
+# ownership and population counts at the end of each month. 'full' is slow, meant for debugging and tests
+INVARIANT_CHECKS = 'cheap'
+
+# Save a checkpoint of the full state of each run every given number of months, so that it can be resumed
+# (see main.py --resume). None to disable
+CHECKPOINT_MONTHS = None
+
+# Made-up world of rectangular municipalities (see world/synthetic.py), instead of the actual ACPs, shapefiles
+# and data. For benchmarking at controlled scales. The number of agents is POPULATION * PERCENTAGE_ACTUAL_POP.
+# None to use PROCESSING_ACPS. Example:
+# SYNTHETIC_WORLD = {'MUNICIPALITIES': 4, 'REGIONS_PER_MUNICIPALITY': 3, 'POPULATION': 1000000, 'STATE': 'DF', 'SEED': 0}
+SYNTHETIC_WORLD = None
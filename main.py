@@ -13,6 +13,7 @@ import json
 import logging
 import os
 import random
+import shutil
 import sys
 from collections import defaultdict
 import datetime
@@ -27,10 +28,12 @@ import pandas as pd
 from joblib import Parallel, delayed
 
 import conf
-from analysis import report
+from analysis import benchmark, report
 from analysis.output import OUTPUT_DATA_SPEC
 from analysis.plotting import Plotter, MissingDataError
 from simulation import Simulation
+from world import checkpoint, funds
+from world.scheduler import Scheduler
 # from web import app
 
 matplotlib.use('agg')
@@ -53,8 +56,88 @@ def single_run(params, path):
     """Run a simulation once for given parameters"""
     if conf.RUN['PRINT_STATISTICS_AND_RESULTS_DURING_PROCESS']:
         logging.basicConfig(level=logging.INFO)
-    sim = Simulation(params, path)
-    sim.initialize()
+    # Runs of an interrupted command that had already finished are not run again
+    if checkpoint.is_complete(path):
+        logger.info('Run already completed: {}'.format(path))
+        return
+    fname = checkpoint.latest(path)
+    sim = Simulation(params, path, resume=fname is not None)
+    if fname is not None:
+        sim.restore(fname)
+    else:
+        sim.initialize()
+    sim.run()
+
+    if conf.RUN['PLOT_EACH_RUN']:
+        logger.info('Plotting run...')
+        plot([('run', path)], os.path.join(path, 'plots'), params, sim=sim)
+
+
+# Params that may vary among runs forked from the same prefix, as they are read only once policies start
+# (see funds.policies_start), each with the value its prefix is run under. Until policies start, all of them
+# gather the same funds and register the same families, whereas 'no_policy' gathers nothing.
+# Any other param is read from the first month on, so runs that differ in it cannot be forked
+FORKABLE_PARAMS = {
+    'POLICIES': lambda value: funds.POLICIES[0] if value in funds.POLICIES else value,
+    'POLICY_DAYS': lambda value: conf.PARAMS['POLICY_DAYS'],
+}
+
+
+def fork_prefixes(params, fork_months):
+    """Params of the prefix each configuration is forked from.
+    Raises click.UsageError if configurations differ in params that are read before the fork"""
+    months = Scheduler(params[0]['STARTING_DAY'], params[0]['TOTAL_DAYS']).months
+    if not 0 < fork_months < len(months):
+        raise click.UsageError('Cannot fork after {} months of a run of {} months'.format(fork_months, len(months)))
+    varying = {k for p in params for k in p if any(q.get(k) != p[k] for q in params)}
+    unforkable = varying - set(FORKABLE_PARAMS)
+    if unforkable:
+        raise click.UsageError('Cannot fork runs that differ in {}, only in {}'.format(
+            ', '.join(sorted(unforkable)), ', '.join(sorted(FORKABLE_PARAMS))))
+    if varying and months[fork_months - 1] >= funds.policies_start(params[0]):
+        raise click.UsageError('Runs that differ in {} must be forked before policies start, on {}'.format(
+            ', '.join(sorted(varying)), funds.policies_start(params[0])))
+    prefixes = []
+    for p in params:
+        p = copy.deepcopy(p)
+        for k in varying:
+            p[k] = FORKABLE_PARAMS[k](p[k])
+        prefixes.append(p)
+    return prefixes
+
+
+def prefix_run(params, path, months):
+    """Run a simulation for its first `months` months only and checkpoint it, so it can be forked"""
+    if conf.RUN['PRINT_STATISTICS_AND_RESULTS_DURING_PROCESS']:
+        logging.basicConfig(level=logging.INFO)
+    fname = checkpoint.latest(path)
+    sim = Simulation(params, path, resume=fname is not None)
+    if fname is not None:
+        sim.restore(fname)
+    else:
+        sim.initialize()
+    sim.run(months=months)
+    return checkpoint.save(sim)
+
+
+def fork_run(params, prefix_path, path):
+    """Run a simulation on from the checkpoint of a prefix run, under its own params"""
+    if conf.RUN['PRINT_STATISTICS_AND_RESULTS_DURING_PROCESS']:
+        logging.basicConfig(level=logging.INFO)
+    if checkpoint.is_complete(path):
+        logger.info('Run already completed: {}'.format(path))
+        return
+    fname = checkpoint.latest(path)
+    fork = fname is None
+    if fork:
+        # Start off the outputs of the prefix
+        fname = checkpoint.latest(prefix_path)
+        if not os.path.exists(path):
+            os.makedirs(path)
+        for f in glob(os.path.join(prefix_path, 'temp_*.csv')):
+            shutil.copy(f, path)
+    sim = Simulation(params, path, resume=True)
+    sim.restore(fname, fork=fork)
     sim.run()
 
     if conf.RUN['PLOT_EACH_RUN']:
@@ -62,8 +145,10 @@ def single_run(params, path):
         plot([('run', path)], os.path.join(path, 'plots'), params, sim=sim)
 
 
-def multiple_runs(overrides, runs, cpus, output_dir, fix_seeds=False):
-    """Run multiple configurations, each `runs` times"""
+def multiple_runs(overrides, runs, cpus, output_dir, fix_seeds=False, fork_months=None):
+    """Run multiple configurations, each `runs` times.
+    If `fork_months` is given, the first months are simulated once per run and forked into every configuration
+    from there. Configurations may only differ in FORKABLE_PARAMS then (see fork_prefixes)"""
     logger.info('Running simulation {} times'.format(len(overrides) * runs))
 
     if fix_seeds:
@@ -80,8 +165,44 @@ def multiple_runs(overrides, runs, cpus, output_dir, fix_seeds=False):
         p.update(o)
         params.append(p)
 
+    if fork_months:
+        # Configurations with the same prefix params share their prefix runs
+        prefixes = {}
+        prefix_of = []
+        for p in fork_prefixes(params, fork_months):
+            label = conf_to_str({k: p[k] for k in FORKABLE_PARAMS if k in p}, delimiter=';')
+            prefixes.setdefault(label, p)
+            prefix_of.append(label)
+        prefix_jobs = []
+        for label, p in prefixes.items():
+            for i in range(runs):
+                p = copy.deepcopy(p)
+                if seeds:
+                    p['SEED'] = seeds[i]
+                prefix_jobs.append((p, os.path.join(output_dir, 'prefix', label, str(i)), fork_months))
+
+        logger.info('Running {} shared prefixes of {} months'.format(len(prefix_jobs), fork_months))
+        if cpus == 1:
+            for job in prefix_jobs:
+                prefix_run(*job)
+        else:
+            Parallel(n_jobs=cpus)(delayed(prefix_run)(*job) for job in prefix_jobs)
+
+        jobs = []
+        for p, path, label in zip(params, paths, prefix_of):
+            for i in range(runs):
+                if seeds:
+                    p['SEED'] = seeds[i]
+                jobs.append((copy.deepcopy(p), os.path.join(output_dir, 'prefix', label, str(i)),
+                             os.path.join(path, str(i))))
+        if cpus == 1:
+            for job in jobs:
+                fork_run(*job)
+        else:
+            Parallel(n_jobs=cpus)(delayed(fork_run)(*job) for job in jobs)
+
     # run simulations in parallel
-    if cpus == 1:
+    elif cpus == 1:
         # run serially if cpus==1, easier debugging
         for p, path in zip(params, paths):
             for i in range(runs):
@@ -123,6 +244,7 @@ def multiple_runs(overrides, runs, cpus, output_dir, fix_seeds=False):
     with open(os.path.join(output_dir, 'meta.json'), 'w') as f:
         json.dump(results, f, default=str)
 
+    summarize_times(paths, output_dir)
     plot_results(output_dir)
 
     # link latest sim to convenient path
@@ -139,6 +261,31 @@ def multiple_runs(overrides, runs, cpus, output_dir, fix_seeds=False):
     return results
 
 
+def summarize_times(paths, output_dir, top=10):
+    """Sum the time of each phase of the month over all runs and log the slowest ones"""
+    spec = OUTPUT_DATA_SPEC['time']
+    dfs = []
+    for path in paths:
+        for f in glob(os.path.join(path, '*', 'temp_time.csv')):
+            df = pd.read_csv(f, sep=';', decimal='.', header=None, names=spec['columns'])
+            df['run'] = f
+            dfs.append(df)
+    if not dfs:
+        return
+    df = pd.concat(dfs)
+    n_months = df.groupby('run')['month'].nunique().sum()
+    times = df.groupby('phase').agg(seconds=('seconds', 'sum'), count=('count', 'mean'))
+    times['share'] = times['seconds'] / times['seconds'].sum()
+    times['seconds_per_month'] = times['seconds'] / n_months
+    times = times.sort_values('seconds', ascending=False)
+    times.to_csv(os.path.join(output_dir, 'times.csv'), sep=';')
+
+    logger.info('Slowest phases, over {} run month(s):'.format(n_months))
+    for phase, row in times.head(top).iterrows():
+        logger.info('{:>14}: {:9.2f}s {:6.1%} {:8.3f}s/month, {:,.0f} entities'.format(
+            phase, row['seconds'], row['share'], row['seconds_per_month'], row['count']))
+
+
 def average_run_data(path, avg='mean'):
     """Average the run data for a specified output path"""
     output_path = os.path.join(path, 'avg')
@@ -259,7 +406,8 @@ def gen_output_dir(command):
 @click.option('-c', '--cpus', help='Number of CPU cores to use', default=1)
 @click.option('-p', '--params', help='JSON of params override')
 @click.option('-r', '--config', help='JSON of run config override')
-def main(ctx, runs, cpus, params, config):
+@click.option('-s', '--resume', help='Output directory of an interrupted command to resume from its checkpoints')
+def main(ctx, runs, cpus, params, config, resume):
     if conf.RUN['SAVE_AGENTS_DATA'] is None:
         logger.warn('Warning!!! Are you sure you do NOT want to save AGENTS\' data?')
 
@@ -275,7 +423,8 @@ def main(ctx, runs, cpus, params, config):
     conf.RUN.update(config)    # applied globally
 
     ctx.obj = {
-        'output_dir': gen_output_dir(ctx.invoked_subcommand),
+        'output_dir': resume or gen_output_dir(ctx.invoked_subcommand),
+        'resume': resume is not None,
         'runs': runs,
         'cpus': cpus
     }
@@ -292,15 +441,18 @@ def run(ctx):
 
 @main.command()
 @click.argument('params', nargs=-1)
+@click.option('-f', '--fork-months', type=int, default=None,
+              help='Simulate the first months once and fork each value from there (policy params only)')
 @click.pass_context
-def sensitivity(ctx, params):
+def sensitivity(ctx, params, fork_months):
     """
     Continuous param syntax: NAME:MIN:MAX:STEP
     Boolean param syntax: NAME
     """
     for param in params:
         flag = None
-        ctx.obj['output_dir'] = gen_output_dir(ctx.command.name)
+        if not ctx.obj['resume']:
+            ctx.obj['output_dir'] = gen_output_dir(ctx.command.name)
 
         # if ':' present, assume continuous param
         if ':' in param:
@@ -352,7 +504,8 @@ def sensitivity(ctx, params):
         conf.RUN['SKIP_PARAM_GROUP_PLOTS'] = True
 
         logger.info('Sensitivity run over {} for values: {}, {} run(s) each'.format(p_name, p_vals, ctx.obj['runs']))
-        multiple_runs(confs, ctx.obj['runs'], ctx.obj['cpus'], ctx.obj['output_dir'], fix_seeds=True)
+        multiple_runs(confs, ctx.obj['runs'], ctx.obj['cpus'], ctx.obj['output_dir'], fix_seeds=True,
+                      fork_months=fork_months)
 
 
 @main.command()
@@ -424,6 +577,41 @@ def acps(ctx):
     multiple_runs(confs, ctx.obj['runs'], ctx.obj['cpus'], ctx.obj['output_dir'])
 
 
+@main.command()
+@click.option('-m', '--months', help='Number of months of each case', default=12)
+@click.option('-w', '--worlds', help='Comma separated worlds to run, out of {}'.format(', '.join(benchmark.WORLDS)))
+@click.option('-a', '--percentages', help='Comma separated PERCENTAGE_ACTUAL_POP values to run')
+@click.option('-b', '--baseline', help='JSON report to compare against', type=click.Path(exists=True))
+@click.option('-t', '--tolerance', help='Relative change flagged as a regression', default=.1)
+@click.pass_context
+def bench(ctx, months, worlds, percentages, baseline, tolerance):
+    """
+    Benchmark months/second, time per phase, peak memory and output size over a matrix of scales
+    """
+    worlds = worlds.split(',') if worlds else None
+    percentages = [float(p) for p in percentages.split(',')] if percentages else None
+    report = benchmark.run(conf.RUN, conf.PARAMS, ctx.obj['output_dir'], months, worlds, percentages)
+    fname = os.path.join(ctx.obj['output_dir'], 'bench.json')
+    benchmark.save(report, fname)
+
+    for case in report['cases']:
+        logger.info('{:>14}: {:,} agents, {:7.3f} months/s, {:8.1f} MB, {:,} output bytes. Slowest: {}'.format(
+            case['name'], case['agents'], case['months_per_second'], case['peak_rss_mb'], case['output_bytes'],
+            ', '.join('{} {:.2f}s'.format(k, v) for k, v in list(case['phases'].items())[:3])))
+    logger.info('Report saved to {}'.format(fname))
+
+    if baseline:
+        regressions = 0
+        for name, metric, base, value, change, regression in benchmark.compare(report, benchmark.load(baseline),
+                                                                              tolerance):
+            regressions += regression
+            logger.info('{:>14} {:>17}: {:12.3f} -> {:12.3f} ({:+.1%}){}'.format(
+                name, metric, base, value, change, ' REGRESSION' if regression else ''))
+        if regressions:
+            logger.warning('{} regression(s) against {}'.format(regressions, baseline))
+            ctx.exit(1)
+
+
 @main.command()
 @click.argument('params', nargs=-1)
 def make_plots(params):
@@ -1,5 +1,97 @@
+"""
+Goods market. Every month each family consumes from one of a sample of consumer firms, the cheapest or the closest.
+Choices are made for all families at once, with arrays, and sales are then settled in the order of families,
+as each sale depletes the stock of the firm for the next ones.
+"""
+import numpy as np
+
+from world import invariants
+
+
+def sample_rows(seed, n, population, k):
+    """`n` random samples of `k` distinct integers below `population`, in random order, as an (n, k) array"""
+    k = min(k, population)
+    if 2 * k >= population:
+        return np.argsort(seed.random((n, population)), axis=1)[:, :k]
+    sample = seed.integers(0, population, (n, k))
+    while True:
+        ordered = np.sort(sample, axis=1)
+        repeated = np.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+        if not len(repeated):
+            return sample
+        # Draw again samples with repeated values
+        sample[repeated] = seed.integers(0, population, (len(repeated), k))
+
 
 def consume(sim):
+    """Families consume their permanent income, based on members wages, working life expectancy
+    and real estate and savings real interest. Each picks SIZE_MARKET firms and buys from the closest
+    or the cheapest of those that have products in stock."""
     firms = list(sim.consumer_firms.values())
-    for family in sim.families.values():
-        family.consume(firms, sim.central, sim.regions, sim.PARAMS, sim.seed, sim.clock.year, sim.clock.months)
+    families = list(sim.families.values())
+    window = sim.PARAMS.get('PERMANENT_INCOME_WINDOW')
+    # Decision on how much money to consume or save
+    spend = [f.to_consume(sim.central, sim.central.interest, sim.clock.year, sim.clock.months, window)
+             for f in families]
+    if not firms or not families:
+        return
+    # Firms have a single product (see Firm.create_product), or none yet
+    if invariants.enabled('cheap'):
+        assert all(len(f.inventory) <= 1 for f in firms)
+
+    # Picks SIZE_MARKET number of firms at random and ranks them by price or by distance
+    market = sample_rows(sim.np_seed, len(families), len(firms), int(sim.PARAMS['SIZE_MARKET']))
+    by_price = sim.np_seed.random(len(families)) < .5
+    prices = np.array([np.inf if f.prices is None else f.prices for f in firms])
+    firm_rows = np.array([sim.distances.firm_row(f) for f in firms])
+    house_rows = np.array([f.house.row for f in families])
+    distance = sim.distances.pairs(np.repeat(house_rows, market.shape[1]), firm_rows[market].ravel())
+    key = np.where(by_price[:, None], prices[market], distance.reshape(market.shape))
+    ranked = np.take_along_axis(market, np.argsort(key, axis=1, kind='stable'), axis=1).tolist()
+
+    # Settle sales in order, as Firm.sale does, each family buying from the first firm of its ranking with stock
+    stock = [f.total_quantity for f in firms]
+    unit_price = [f.inventory[0].price if f.inventory else np.inf for f in firms]
+    sold = [0] * len(firms)
+    chosen, paid = [], []
+    for family, money, ranking in zip(families, spend, ranked):
+        if money is None:
+            continue
+        firm = next((i for i in ranking if stock[i] > 0), None)
+        if firm is None:
+            continue
+        change = money
+        if money > 0:
+            amount = money
+            bought = amount / unit_price[firm]
+            # Verifying if demand is within firms' available inventory
+            if bought > stock[firm]:
+                bought = stock[firm]
+                amount = bought * unit_price[firm]
+            stock[firm] -= bought
+            sold[firm] += bought
+            chosen.append(firm)
+            paid.append(amount)
+            change = money - amount
+        family.savings += change
+        # Update family utility
+        family.average_utility = money - change
+
+    # Revenue of firms, net of taxes, and consumption taxes to their regions
+    tax_consumption = sim.PARAMS['TAX_CONSUMPTION']
+    chosen, paid = np.array(chosen, dtype=np.int64), np.array(paid, dtype=np.float64)
+    taxes = paid * tax_consumption
+    revenue = np.bincount(chosen, weights=paid - taxes, minlength=len(firms)).tolist()
+    region_codes = {}
+    region_of = np.array([region_codes.setdefault(f.region_id, len(region_codes)) for f in firms], dtype=np.int64)
+    region_ids = list(region_codes)
+    region_taxes = np.bincount(region_of[chosen], weights=taxes, minlength=len(region_ids)).tolist()
+    for i in np.unique(chosen).tolist():
+        firm = firms[i]
+        firm.inventory[0].quantity = stock[i]
+        firm.total_balance += revenue[i]
+        firm.revenue += revenue[i]
+        firm.amount_sold += sold[i]
+    for region_id, tax in zip(region_ids, region_taxes):
+        if tax:
+            sim.regions[region_id].collect_taxes(tax, 'consumption')
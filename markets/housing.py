@@ -2,51 +2,68 @@
 This module is where the real estate market takes effect.
 Definitions on ownership and actual living residence is made.
 """
-from numpy import median
+import numpy as np
+
+from analysis.groups import Groups
+from world import invariants
+from .listings import PriceIndex, RegionalPriceIndex, ListingBook, SearchAreas
 from .rentmarket import RentalMarket, collect_rent
 
 
 class HousingMarket:
     def __init__(self):
         self.rental = RentalMarket()
-        self.for_sale = list()
+        self.for_sale = ListingBook()
+        self.areas = None
+
+    def search_areas(self, sim, region_id):
+        """Lists of regions where a family of the region looks for houses, from the closest,
+        or None if it looks everywhere (see HOUSING_SEARCH_RADIUS)"""
+        radius = sim.PARAMS.get('HOUSING_SEARCH_RADIUS')
+        if radius is None or region_id is None:
+            return None
+        if self.areas is None or self.areas.levels[-1] != radius:
+            self.areas = SearchAreas(sim.mun_to_regions, sim.geo.mun_to_acp, radius)
+        return self.areas.of(region_id)
 
     @staticmethod
     def process_monthly_rent(sim):
         """ Collection of rental payment due made by households that are renting """
-        to_pay_rent = [h for h in sim.houses.values() if h.rent_data is not None]
+        to_pay_rent = sim.houses.rented()
         collect_rent(to_pay_rent, sim)
 
     def update_for_sale(self, sim):
         # Using neighborhood_wealth effect as attractive for prices
         neighborhood_wealth = dict()
         if sim.PARAMS['NEIGHBORHOOD_EFFECT']:
+            families = list(sim.families.values())
+            medians = Groups([f.house.region_id for f in families]).median([f.get_permanent_income()
+                                                                            for f in families])
             for key in sim.regions.keys():
-                neighborhood_wealth[key] = median([f.get_permanent_income()
-                                                   for f in sim.families.values()
-                                                   if f.house.region_id == key])
+                # Regions without families have no median
+                neighborhood_wealth[key] = medians.get(key, np.nan)
             _max, _min = max(neighborhood_wealth.values()), min(neighborhood_wealth.values())
             neighborhood_wealth = {k: (v - _min) / (_max - _min) for k, v in neighborhood_wealth.items()}
 
-        for house in sim.houses.values():
-            # Updating all houses values every month
-            house.update_price(sim.regions,
-                               sim.PARAMS['ON_MARKET_DECAY_FACTOR'],
-                               sim.PARAMS['MAX_OFFER_DISCOUNT'],
-                               neighborhood_wealth,
-                               sim.PARAMS['NEIGHBORHOOD_EFFECT'])
-
-            # If house is empty, and not already on sales list, add it to houses on the market and start counting
-            # However, if house is empty and had been empty count one extra month
-            if not house.is_occupied:
-                if house not in self.for_sale:
-                    house.on_market = 0
-                    self.for_sale.append(house)
-                else:
-                    house.on_market += 1
+        # Updating all houses values every month
+        sim.houses.update_prices(sim.regions,
+                                 sim.PARAMS['ON_MARKET_DECAY_FACTOR'],
+                                 sim.PARAMS['MAX_OFFER_DISCOUNT'],
+                                 neighborhood_wealth,
+                                 sim.PARAMS['NEIGHBORHOOD_EFFECT'])
+
+        # If house is empty, and not already on sales list, add it to houses on the market and start counting
+        # However, if house is empty and had been empty count one extra month
+        for house in sim.houses.vacant():
+            if house not in self.for_sale:
+                house.on_market = 0
+                self.for_sale.add(house)
+            else:
+                house.on_market += 1
 
-        # Order houses by price most expensive first
-        # self.for_sale.sort(key=lambda h: h.price, reverse=True)
+        # Order houses by their new prices
+        self.for_sale.reprice()
+        self.rental.vacancies.reprice()
 
     def housing_market(self, sim):
         """Start of the housing market"""
@@ -88,7 +105,9 @@ class HousingMarket:
 
         # Deduce houses that are to be rented from sales pool and
         # Restrict list of available houses to families' maximum paying ability
-        for_sale = [h for h in self.for_sale if (h not in for_rent) and (h.price < family_maximum_purchasing_power)]
+        rented = set(h.id for h in for_rent)
+        for_sale = PriceIndex(h for h in self.for_sale.by_price.under(family_maximum_purchasing_power)
+                              if h.id not in rented)
 
         # Create two (local) lists for those families that are Purchasing and those that are Renting
         if not for_sale:
@@ -101,13 +120,14 @@ class HousingMarket:
             # Rationale for decision on renting in the literature is dependent on loads of future uncertainties.
             renting = sim.seed.sample(looking, int(len(looking) * sim.PARAMS['RENTAL_SHARE']))
             # The families that are not renting, want join the purchasing list
-            willing = [f for f in looking if f not in renting]
+            renting_ids = set(f.id for f in renting)
+            willing = [f for f in looking if f.id not in renting_ids]
             # Minimum price on market
-            minimum_price = for_sale[-1].price
+            minimum_price = for_sale.cheapest(1)[0].price
             # However, families that cannot afford to buy, will have also have to join the renting list...
-            [renting.append(f) for f in willing if f.savings_with_loan < minimum_price]
+            renting += [f for f in willing if f.savings_with_loan < minimum_price]
             # ... and only those who remain will join the purchasing list
-            purchasing = [f for f in willing if f not in renting]
+            purchasing = [f for f in willing if f.savings_with_loan >= minimum_price]
 
         # Call Rental market ###############################################################
         if renting and for_rent:
@@ -122,19 +142,43 @@ class HousingMarket:
     def sales_market(self, sim, purchasing, for_sale):
         # Proceed to Sales market ###########################################################
         vacancy = sim.stats.calculate_house_vacancy(sim.houses, False)
+        # Houses by region, when families only look around (see HOUSING_SEARCH_RADIUS)
+        by_region = None
+        if sim.PARAMS.get('HOUSING_SEARCH_RADIUS') is not None:
+            by_region = RegionalPriceIndex(for_sale)
         # For each family
         for family in purchasing:
-            self.negotiating(family, for_sale, sim, vacancy)
+            self.negotiating(family, for_sale, sim, vacancy, by_region)
 
-    def negotiating(self, family, for_sale, sim, vacancy):
+    def negotiating(self, family, for_sale, sim, vacancy, by_region=None):
         savings = family.savings + sim.central.sum_deposits(family)
         savings_with_mortgage = family.savings_with_loan
-        my_market = sim.seed.sample(for_sale, min(len(for_sale), int(sim.PARAMS['SIZE_MARKET']) * 3))
+        # Houses the family might afford below: with savings plus mortgage,
+        # or with savings as a low offer, after the discount of a large empty market
+        budget = savings_with_mortgage
+        if sim.PARAMS['CAPPED_LOW_VALUE'] > 0:
+            budget = max(budget, savings / sim.PARAMS['CAPPED_LOW_VALUE'])
+        else:
+            # Low offers are then not capped by price
+            budget = float('inf')
+        discount = 1 - vacancy if sim.PARAMS['OFFER_SIZE_ON_PRICE'] else 1
+        budget = budget / discount if discount > 0 else float('inf')
+        size = int(sim.PARAMS['SIZE_MARKET']) * 3
+        areas = self.search_areas(sim, family.region_id)
+        if areas is None or by_region is None:
+            my_market = for_sale.sample(sim.seed, size, high=budget)
+        else:
+            # Closest area with enough houses to sample from, or the widest one
+            regions = next((a for a in areas if by_region.count(a, high=budget) >= size), areas[-1])
+            my_market = by_region.sample(sim.seed, size, regions, high=budget)
         my_market.sort(key=lambda h: h.price, reverse=True)
         # If family has enough funds, or successfully gets a loan, it buys the first house of the stack.
         # Only houses that are within savings or savings plus loan compose each family individual market
         # Otherwise, it tries another one.
         for house in my_market:
+            # Sold to a family that came first
+            if house not in self.for_sale:
+                continue
             cash = 0
             p = house.price
             # A large empty market makes those selling ask for a lower price
@@ -178,8 +222,7 @@ class HousingMarket:
             # Register the transaction, collect taxes and consider moving
             self.notarial_procedures(family, house, price, change, sim)
             # if the procedures have come this far, it means loan or price have being agreed upon.
-            # Clean for_sale list.
-            self.for_sale[:] = [h for h in for_sale if h is not house]
+            # The house has left the listings as it changed owners.
             # Having bought a house, then it can move on to the next family
             return
 
@@ -192,7 +235,8 @@ class HousingMarket:
 
         if house.family_owner:
             # Deposit money on selling family account
-            assert (house.owner_id in sim.firms) is False
+            if invariants.enabled('cheap'):
+                assert (house.owner_id in sim.firms) is False
             sim.families[house.owner_id].update_balance(price - taxes)
             # Transfer ownership
             sim.families[house.owner_id].owned_houses.remove(house)
@@ -246,8 +290,9 @@ class HousingMarket:
             family.move_out(sim.funds)
         family.move_in(house)
         # Only after simulation has begun, it is necessary to update population, not at generation time
+        # Members not in the simulation yet (immigrants) are counted as they join it
         try:
             if sim.mun_pops:
-                sim.update_pop(old_r_id, family.region_id)
+                sim.update_pop(old_r_id, family.region_id, len([m for m in family.members if m in sim.agents]))
         except AttributeError:
             pass
@@ -1,3 +1,26 @@
+import numpy as np
+
+
+def greedy_matches(firms, candidates, scores):
+    """
+    Offers (indices into the arrays of firms, candidates and scores) accepted when going through all offers
+    from the highest score (ties in their order), each firm hiring and each candidate taking the first offer
+    in which neither is taken yet, in that order
+    """
+    order = np.argsort(-scores, kind='stable')
+    n_firms = len(np.unique(firms))
+    firm_taken = np.zeros(firms.max() + 1 if len(firms) else 0, dtype=bool).tolist()
+    cand_taken = np.zeros(candidates.max() + 1 if len(candidates) else 0, dtype=bool).tolist()
+    accepted = []
+    for o, f, c in zip(order.tolist(), firms[order].tolist(), candidates[order].tolist()):
+        if not firm_taken[f] and not cand_taken[c]:
+            firm_taken[f] = cand_taken[c] = True
+            accepted.append(o)
+            if len(accepted) == n_firms:
+                break
+    return accepted
+
+
 class LaborMarket:
     """
     This class makes the match among firms and prospective candidates.
@@ -9,8 +32,9 @@ class LaborMarket:
     Lists are emptied every month.
     """
 
-    def __init__(self, seed):
+    def __init__(self, seed, np_seed):
         self.seed = seed
+        self.np_seed = np_seed
         self.available_postings = list()
         self.candidates = list()
 
@@ -25,25 +49,13 @@ class LaborMarket:
         self.available_postings = list()
         self.candidates = list()
 
-    def assign_post(self, unemployment, wage_deciles, params):
+    def assign_post(self, unemployment, wage_deciles, params, distances):
         """Rank positions by revenue. Make a match as workers considers mobility choices """
         pct_distance_hiring = params['PCT_DISTANCE_HIRING']
         ignore_unemployment = params['WAGE_IGNORE_UNEMPLOYMENT']
 
         self.seed.shuffle(self.candidates)
-        if wage_deciles is not None:
-            for c in self.candidates:
-                if c.last_wage:
-                    for i, d in enumerate(wage_deciles):
-                        if d > c.last_wage:
-                            break
-                    p_car = params['WAGE_TO_CAR_OWNERSHIP_QUANTILES'][i]
-                    c.has_car = self.seed.random() < p_car
-                else:
-                    c.has_car = False
-        else:
-            for c in self.candidates:
-                c.has_car = False
+        self.assign_cars(wage_deciles, params['WAGE_TO_CAR_OWNERSHIP_QUANTILES'])
 
         # If parameter of distance or qualification is ON, firms are the ones that are divided by the criteria
         # Candidates consider distance when they deduce cost of mobility from potential wage bundle
@@ -64,38 +76,71 @@ class LaborMarket:
         by_dist.sort(key=lambda p: p[1], reverse=True)
 
         # Two matching processes. 1. By qualification 2. By distance only, if candidates left
-        cand_still_looking = self.matching_firm_offers(by_qual, params, cand_looking=None, flag='qualification')
-        self.matching_firm_offers(by_dist, params, cand_still_looking)
+        cand_still_looking = self.matching_firm_offers(by_qual, params, distances, cand_looking=None,
+                                                       flag='qualification')
+        self.matching_firm_offers(by_dist, params, distances, cand_still_looking)
 
         self.available_postings = []
         self.candidates = []
 
-    def matching_firm_offers(self, lst_firms, params, cand_looking=None, flag=None):
-        if cand_looking:
-            candidates = cand_looking
-        else:
+    def assign_cars(self, wage_deciles, p_car):
+        """Candidates own a car with probability `p_car` of the decile of their last wage.
+        Those that never earned, or without wage deciles, have none"""
+        if not self.candidates:
+            return
+        agents = self.candidates[0].store
+        rows = np.array([c.id for c in self.candidates])
+        if wage_deciles is None:
+            agents.has_car[rows] = False
+            return
+        wages = agents.last_wage[rows]
+        earning = ~np.isnan(wages) & (wages != 0)
+        # Decile of each wage: the first one above it, or the last
+        decile = np.minimum(np.searchsorted(wage_deciles, wages, side='right'), len(wage_deciles) - 1)
+        agents.has_car[rows] = earning & (self.np_seed.random(len(rows)) < np.asarray(p_car)[decile])
+
+    def matching_firm_offers(self, lst_firms, params, distances, cand_looking=None, flag=None):
+        # An empty list of candidates still looking means that all were hired already, not that all are looking
+        if cand_looking is None:
             candidates = self.candidates
-        offers = []
-        done_firms = set()
-        done_cands = set()
+        else:
+            candidates = cand_looking
+        # Offers refer to candidates by their position in `looking`, in order of their first offer
+        position = {}
+        looking, houses = [], []
+
         # This organizes a number of offers of candidates per firm, according to their own location
         # and "size" of a firm, giving by its more recent revenue level
+        offer_firms, offer_cands, wages, firm_rows = [], [], [], []
+        firms = {}
         for firm, wage in lst_firms:
             candidates = self.seed.sample(candidates, min(len(candidates), int(params['HIRING_SAMPLE_SIZE'])))
             for c in candidates:
-                transit_cost = params['PRIVATE_TRANSIT_COST'] if c.has_car else params['PUBLIC_TRANSIT_COST']
-                score = wage - (c.family.house.distance_to_firm(firm) * transit_cost)
-                if flag:
-                    offers.append((firm, c, c.qualification + score))
-                else:
-                    offers.append((firm, c, score))
+                if c not in position:
+                    position[c] = len(looking)
+                    looking.append(c)
+                    houses.append(c.family.house.row)
+            offer_firms += [firms.setdefault(firm, len(firms))] * len(candidates)
+            offer_cands += [position[c] for c in candidates]
+            wages += [wage] * len(candidates)
+            firm_rows += [distances.firm_row(firm)] * len(candidates)
 
         # Then, the criteria is used to order all candidates
-        offers = sorted(offers, key=lambda o: o[2], reverse=True)
-        for firm, candidate, score in offers:
-            if firm not in done_firms and candidate not in done_cands:
-                self.apply_assign(candidate, firm)
-                done_firms.add(firm)
+        done_cands = set()
+        if offer_cands:
+            hiring = list(firms)
+            offer_firms, offer_cands = np.array(offer_firms), np.array(offer_cands)
+            # Candidates' data does not change while offers are made
+            transit_cost = np.array([params['PRIVATE_TRANSIT_COST'] if c.has_car else params['PUBLIC_TRANSIT_COST']
+                                     for c in looking])
+            qualification = np.array([c.qualification for c in looking], dtype=np.float64)
+            distance = distances.pairs(np.array(houses)[offer_cands], firm_rows)
+            scores = np.array(wages, dtype=np.float64) - (distance * transit_cost[offer_cands])
+            if flag:
+                scores = qualification[offer_cands] + scores
+            for o in greedy_matches(offer_firms, offer_cands, scores):
+                candidate = looking[offer_cands[o]]
+                self.apply_assign(candidate, hiring[offer_firms[o]])
                 done_cands.add(candidate)
 
         # If this run was for qualification, another run for distance has to go through
@@ -109,7 +154,7 @@ class LaborMarket:
         firm.add_employee(chosen)
 
     def look_for_jobs(self, agents):
-        self.candidates += [agent for agent in agents.values() if 16 < agent.age < 70 and agent.firm_id is None]
+        self.candidates += [agents.views[r] for r in agents.unemployed_rows().tolist()]
 
     def hire_fire(self, firms, firm_enter_freq):
         """Firms adjust their labor force based on profit"""
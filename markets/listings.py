@@ -0,0 +1,217 @@
+"""
+Indexes of the houses on the market: for sale (ListingBook) and vacant for rent (VacancyPool).
+The market's listings and vacancies are kept up to date by the house registry (agents.house.HouseRegistry)
+as houses are occupied, vacated or sold, so that markets do not scan all houses.
+"""
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+# Levels of HOUSING_SEARCH_RADIUS, from the closest
+SEARCH_LEVELS = ['region', 'municipality', 'acp']
+
+
+def sample_union(seed, parts, k):
+    """Random sample of up to `k` items of the union of `parts`, (sequence, start, stop) each,
+    without joining them"""
+    sizes = [stop - start for _, start, stop in parts]
+    ends = list(accumulate(sizes))
+    total = ends[-1] if ends else 0
+    sample = []
+    for r in seed.sample(range(total), min(k, total)):
+        i = bisect_right(ends, r)
+        seq, start, _ = parts[i]
+        sample.append(seq[start + r - (ends[i] - sizes[i])])
+    return sample
+
+
+class SearchAreas:
+    """Regions where families of each region look for houses: their own region first,
+    then their municipality, then their ACP, up to `radius` (one of SEARCH_LEVELS)"""
+    def __init__(self, mun_to_regions, mun_to_acp, radius):
+        self.levels = SEARCH_LEVELS[:SEARCH_LEVELS.index(radius) + 1]
+        self.mun_to_regions = mun_to_regions
+        self.acp_to_regions = {}
+        for mun, regions in sorted(mun_to_regions.items()):
+            self.acp_to_regions.setdefault(mun_to_acp.get(mun), []).extend(regions)
+        self.mun_to_acp = mun_to_acp
+        self.cache = {}
+
+    def of(self, region_id):
+        """Lists of regions, from the closest area to the widest"""
+        if region_id not in self.cache:
+            mun = region_id[:7]
+            areas = {'region': [region_id],
+                     'municipality': self.mun_to_regions[mun],
+                     'acp': self.acp_to_regions[self.mun_to_acp.get(mun)]}
+            self.cache[region_id] = [areas[level] for level in self.levels]
+        return self.cache[region_id]
+
+
+class PriceIndex:
+    """Houses sorted by price, for queries by price range in O(log n + k)"""
+    def __init__(self, houses=()):
+        # sorted is stable and fast on nearly sorted input, such as the previous order after prices change
+        self.houses = sorted(houses, key=lambda h: h.price)
+        self.prices = [h.price for h in self.houses]
+        # Price of each house when indexed, as prices change before the index is sorted again
+        self.keys = {h.id: h.price for h in self.houses}
+
+    def insert(self, house):
+        i = bisect_right(self.prices, house.price)
+        self.houses.insert(i, house)
+        self.prices.insert(i, house.price)
+        self.keys[house.id] = house.price
+
+    def remove(self, house):
+        i = bisect_left(self.prices, self.keys.pop(house.id))
+        while self.houses[i] is not house:
+            i += 1
+        del self.houses[i]
+        del self.prices[i]
+
+    def under(self, price):
+        """Houses cheaper than `price`, cheapest first"""
+        return self.houses[:bisect_left(self.prices, price)]
+
+    def cheapest(self, n):
+        return self.houses[:n]
+
+    def band(self, high=float('inf'), low=0):
+        """Houses priced from `low` up to (not including) `high`, as (houses, start, stop)"""
+        return self.houses, bisect_left(self.prices, low), bisect_left(self.prices, high)
+
+    def sample(self, seed, k, high=float('inf'), low=0):
+        """Random sample of up to `k` houses priced from `low` up to (not including) `high`"""
+        return sample_union(seed, [self.band(high, low)], k)
+
+    def __iter__(self):
+        return iter(self.houses)
+
+    def __len__(self):
+        return len(self.houses)
+
+
+class RegionalPriceIndex:
+    """A PriceIndex of houses for each region, for searches limited to some regions (see SearchAreas)"""
+    def __init__(self, houses=()):
+        by_region = {}
+        for house in houses:
+            by_region.setdefault(house.region_id, []).append(house)
+        self.regions = {region_id: PriceIndex(houses) for region_id, houses in by_region.items()}
+
+    def sample(self, seed, k, regions, high=float('inf'), low=0):
+        """Random sample of up to `k` houses of the regions, priced from `low` up to (not including) `high`"""
+        return sample_union(seed, self.bands(regions, high, low), k)
+
+    def count(self, regions, high=float('inf'), low=0):
+        return sum(stop - start for _, start, stop in self.bands(regions, high, low))
+
+    def bands(self, regions, high, low):
+        return [self.regions[r].band(high, low) for r in regions if r in self.regions]
+
+
+class ListingBook:
+    """Houses on the market, in order of listing, and also sorted by price (by_price).
+    Houses leave it as soon as they are occupied or change owners (see HouseRegistry.delist).
+    Prices only change all at once, in the monthly update, which calls reprice"""
+    def __init__(self):
+        self.houses = {}
+        self.by_price = PriceIndex()
+
+    def add(self, house):
+        if house.id not in self.houses:
+            self.houses[house.id] = house
+            self.by_price.insert(house)
+
+    def discard(self, house):
+        if house.id in self.houses:
+            del self.houses[house.id]
+            self.by_price.remove(house)
+
+    def reprice(self):
+        """Sort again after prices have changed"""
+        self.by_price = PriceIndex(self.by_price.houses)
+
+    def __contains__(self, house):
+        return house.id in self.houses
+
+    def __iter__(self):
+        return iter(list(self.houses.values()))
+
+    def __len__(self):
+        return len(self.houses)
+
+
+class VacancyPool:
+    """Vacant houses owned by families, that is, for rent.
+    Random samples, the cheapest house and removal take O(1) or O(log n).
+    Removal moves the last house into the place of the removed one, so the order is arbitrary.
+    The price index is only built when needed, and dropped when prices change (reprice)"""
+    def __init__(self, houses=(), by_region=True):
+        self.houses = []
+        self.positions = {}
+        self.by_price = None
+        # A pool of the vacancies of each region, for searches limited to some regions (see SearchAreas)
+        self.regions = {} if by_region else None
+        for house in houses:
+            self.add(house)
+
+    def add(self, house):
+        if house.id not in self.positions:
+            self.positions[house.id] = len(self.houses)
+            self.houses.append(house)
+            if self.by_price is not None:
+                self.by_price.insert(house)
+            if self.regions is not None:
+                if house.region_id not in self.regions:
+                    self.regions[house.region_id] = VacancyPool(by_region=False)
+                self.regions[house.region_id].add(house)
+
+    def discard(self, house):
+        i = self.positions.pop(house.id, None)
+        if i is None:
+            return
+        last = self.houses.pop()
+        if last is not house:
+            self.houses[i] = last
+            self.positions[last.id] = i
+        if self.by_price is not None:
+            self.by_price.remove(house)
+        if self.regions is not None:
+            self.regions[house.region_id].discard(house)
+
+    def update(self, house):
+        """Add or remove the house, after a change of occupant or type of owner"""
+        if house.family_id is None and house.family_owner:
+            self.add(house)
+        else:
+            self.discard(house)
+
+    def sample(self, seed, k, regions=None):
+        """Random sample of up to `k` houses, of the given regions only, if any"""
+        if regions is None:
+            return seed.sample(self.houses, min(k, len(self.houses)))
+        return sample_union(seed, self.parts(regions), k)
+
+    def count(self, regions):
+        return sum(stop for _, _, stop in self.parts(regions))
+
+    def parts(self, regions):
+        return [(self.regions[r].houses, 0, len(self.regions[r])) for r in regions if r in self.regions]
+
+    def cheapest(self):
+        if self.by_price is None:
+            self.by_price = PriceIndex(self.houses)
+        return self.by_price.cheapest(1)[0]
+
+    def reprice(self):
+        self.by_price = None
+
+    def __contains__(self, house):
+        return house.id in self.positions
+
+    def __iter__(self):
+        return iter(list(self.houses))
+
+    def __len__(self):
+        return len(self.houses)
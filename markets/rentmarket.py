@@ -1,3 +1,4 @@
+from .listings import VacancyPool
 
 
 def collect_rent(houses, sim):
@@ -14,7 +15,7 @@ def collect_rent(houses, sim):
             # If family belongs to rent policy programme, rent is paid for
             if tenant.rent_voucher:
                 # Money has been deducted from municipal balance when voucher was conceded.
-                payment = house.rent_data[0].copy()
+                payment = rent
                 tenant.rent_voucher -= 1
             else:
                 # Withdraw money from family members
@@ -54,14 +55,16 @@ def collect_rent(houses, sim):
 class RentalMarket:
 
     def __init__(self):
-        self.unoccupied = list()
+        # All vacant houses for rent, kept up to date by the house registry
+        self.vacancies = VacancyPool()
+        self.unoccupied = self.vacancies
 
     def update_list(self, sim, to_rent=None):
         if to_rent is not None:
-            self.unoccupied = to_rent
+            self.unoccupied = VacancyPool(h for h in to_rent if h.family_id is None)
         else:
             # Only rent from families, not firms
-            self.unoccupied = [h for h in sim.houses.values() if h.family_id is None and h.family_owner]
+            self.unoccupied = self.vacancies
 
     def maybe_move(self, family, house, price, sim):
         # Make the move
@@ -72,14 +75,15 @@ class RentalMarket:
                 return
             family.move_out(sim.funds)
         family.move_in(house)
-        self.unoccupied.remove(house)
+        self.unoccupied.discard(house)
         # Save information of rental on house
         house.rent_data = price, sim.clock.days
 
         # Only after simulation has begun, it is necessary to update population, not at generation time
+        # Members not in the simulation yet (immigrants) are counted as they join it
         try:
             if sim.mun_pops:
-                sim.update_pop(old_r_id, family.region_id)
+                sim.update_pop(old_r_id, family.region_id, len([m for m in family.members if m in sim.agents]))
         except AttributeError:
             pass
 
@@ -96,11 +100,15 @@ class RentalMarket:
         if families:
             families.sort(key=lambda f: f.get_permanent_income(), reverse=True)
             for family in families:
-                # Make sure list of vacant houses is up-to-date
-                self.unoccupied = [h for h in self.unoccupied if h.family_id is None]
                 # Matching
-                my_market = sim.seed.sample(self.unoccupied, min(len(self.unoccupied),
-                                                                 int(sim.PARAMS['SIZE_MARKET']) * 3))
+                size = int(sim.PARAMS['SIZE_MARKET']) * 3
+                areas = sim.housing.search_areas(sim, family.region_id)
+                if areas is None:
+                    my_market = self.unoccupied.sample(sim.seed, size)
+                else:
+                    # Closest area with enough vacancies to sample from, or the widest one
+                    regions = next((a for a in areas if self.unoccupied.count(a) >= size), areas[-1])
+                    my_market = self.unoccupied.sample(sim.seed, size, regions)
                 in_budget = [h for h in my_market if h.price * base_proportion < family.get_permanent_income()]
                 if in_budget:
                     house = sim.seed.choice(in_budget)
@@ -109,9 +117,11 @@ class RentalMarket:
                     if my_market:
                         my_market.sort(key=lambda h: h.price)
                         house = my_market[0]
+                    elif areas is not None:
+                        # No vacancies around
+                        continue
                     elif self.unoccupied:
-                        self.unoccupied.sort(key=lambda h: h.price)
-                        house = self.unoccupied[0]
+                        house = self.unoccupied.cheapest()
                     else:
                         # Family may go without a house. Try next month if there are vacancies
                         return
@@ -1,78 +1,90 @@
-import datetime
 import json
-import math
 import os
 import pickle
 import random
 import sys
 from collections import defaultdict
+from contextlib import contextmanager
 
 import numpy as np
-import pandas as pd
 
 import analysis
 import conf
 import markets
-from world import Generator, demographics, clock, population
+from agents import AgentStore, HouseRegistry
+from world import Generator, demographics, clock, population, checkpoint, invariants
+from world.distances import make_distances
 from world.firms import firm_growth
 from world.funds import Funds
 from world.geography import Geography, STATES_CODES, state_string
+from world.exogenous import ExogenousCalendar
+from world.scheduler import Scheduler
+from world.synthetic import SyntheticWorld
 
 
 class Simulation:
-    def __init__(self, params, output_path):
+    def __init__(self, params, output_path, resume=False):
         self.PARAMS = params
-        self.geo = Geography(params, self.PARAMS['STARTING_DAY'].year)
+        year = self.PARAMS['STARTING_DAY'].year
+        synthetic = SyntheticWorld(conf.RUN['SYNTHETIC_WORLD'], year) if conf.RUN['SYNTHETIC_WORLD'] else None
+        self.geo = Geography(params, year, synthetic)
         self.funds = Funds(self)
         self.clock = clock.Clock(self.PARAMS['STARTING_DAY'])
-        self.output = analysis.Output(self, output_path)
+        self.scheduler = Scheduler(self.PARAMS['STARTING_DAY'], self.PARAMS['TOTAL_DAYS'])
+        self.scheduler.register('monthly', self.save_transit_start)
+        self.scheduler.register('monthly', self.monthly)
+        self.scheduler.register('quarterly', self.quarterly)
+        self.scheduler.register('yearly', self.yearly)
+        # Checkpoints are taken once all events of the day have run
+        if conf.RUN['CHECKPOINT_MONTHS']:
+            for i, day in enumerate(self.scheduler.months):
+                if (i + 1) % conf.RUN['CHECKPOINT_MONTHS'] == 0:
+                    self.scheduler.add_event(day, 'checkpoint', order=3)
+            self.scheduler.register('checkpoint', self.save_checkpoint)
+        # Date of the checkpoint the run has been resumed from, if any
+        self.resumed_from = None
+        self.output = analysis.Output(self, output_path, reset=not resume)
         self.stats = analysis.Statistics()
         self.logger = analysis.Logger(hex(id(self))[-5:])
         self._seed = random.randrange(sys.maxsize) if conf.RUN['KEEP_RANDOM_SEED'] else conf.RUN.get('SEED', 0)
         self.seed = random.Random(self._seed)
+        # For draws over arrays of agents
+        self.np_seed = np.random.default_rng(self._seed)
         self.generator = Generator(self)
 
-        # Read necessary files
-        self.m_men, self.m_women, self.f = {}, {}, {}
-        for state in self.geo.states_on_process:
-            self.m_men[state] = pd.read_csv('input/mortality/mortality_men_%s.csv' % state,
-                                            sep=';', header=0, decimal='.').groupby('age')
-            self.m_women[state] = pd.read_csv('input/mortality/mortality_women_%s.csv' % state,
-                                              sep=';', header=0, decimal='.').groupby('age')
-            self.f[state] = pd.read_csv('input/fertility/fertility_%s.csv' % state,
-                                        sep=';', header=0, decimal='.').groupby('age')
-
-        # Interest
-        # Average interest rate - Earmarked new operations - Households - Real estate financing - Market rates
-        # PORT. Taxa média de juros das operações de crédito com recursos direcionados - Pessoas físicas -
-        # Financiamento imobiliário com taxas de mercado. BC series 433. 25497. 4390.
-        # Values before 2011-03-01 when the series began are set at the value of 2011-03-01. After, mean.
-        interest = pd.read_csv(f"input/interest_{self.PARAMS['INTEREST']}.csv", sep=';')
-        interest.date = pd.to_datetime(interest.date)
-        self.interest = interest.set_index('date')
-
-    def update_pop(self, old_region_id, new_region_id):
+        # Exogenous series (interest, mortality, fertility, FPM) indexed by month of the run
+        self.calendar = ExogenousCalendar(self.PARAMS, self.geo, self.scheduler.months)
+
+    def update_pop(self, old_region_id, new_region_id, n=1):
+        """`n` agents leave the old region (if any) for the new one (if any)"""
         if old_region_id is not None:
-            self.mun_pops[old_region_id[:7]] += 1
-            self.reg_pops[old_region_id] += 1
+            self.mun_pops[old_region_id[:7]] -= n
+            self.reg_pops[old_region_id] -= n
         if new_region_id is not None:
-            self.mun_pops[new_region_id[:7]] += 1
-            self.reg_pops[new_region_id] += 1
+            self.mun_pops[new_region_id[:7]] += n
+            self.reg_pops[new_region_id] += n
 
     def generate(self):
         """Spawn or load regions, agents, houses, families, and firms"""
-        save_file = '{}.agents'.format(self.output.save_name)
+        save_file = '{}.agent_store'.format(self.output.save_name)
         if not os.path.isfile(save_file) or conf.RUN['FORCE_NEW_POPULATION']:
             self.logger.logger.info('Creating new agents')
             regions = self.generator.create_regions()
             agents, houses, families, firms = self.generator.create_all(regions)
-            agents = {a: agents[a] for a in agents.keys() if agents[a].address is not None}
+            # Only agents that have an address take part in the simulation
+            for agent in agents.values():
+                if agent.address is not None:
+                    self.agents[agent.id] = agent
+            agents = self.agents
+            houses = HouseRegistry(houses)
+            # Ids of later houses, families and firms go on from the stream that made the population
             with open(save_file, 'wb') as f:
-                pickle.dump([agents, houses, families, firms, regions], f)
+                pickle.dump([agents, houses, families, firms, regions, self.generator.id_seed.getstate()], f)
         else:
             self.logger.logger.info('Loading existing agents')
             with open(save_file, 'rb') as f:
-                 agents, houses, families, firms, regions = pickle.load(f)
+                 agents, houses, families, firms, regions, id_state = pickle.load(f)
+            self.generator.id_seed.setstate(id_state)
 
         # Count populations for each municipality and region
         self.mun_pops = {}
@@ -89,42 +101,64 @@ class Simulation:
 
         return regions, agents, houses, families, firms, self.generator.central
 
-    def run(self):
-        """Runs the simulation"""
+    def run(self, months=None):
+        """Runs the simulation. If `months` is given, only up to the end of that month of the run,
+        so that it can be forked from there (see restore)"""
         self.logger.logger.info('Starting run.')
         self.logger.logger.info('Output: {}'.format(self.output.path))
         self.logger.logger.info('Params: {}'.format(json.dumps(self.PARAMS, default=str)))
         self.logger.logger.info('Seed: {}'.format(self._seed))
 
         self.logger.logger.info('Running...')
-        while self.clock.days < self.PARAMS['STARTING_DAY'] + datetime.timedelta(days=self.PARAMS['TOTAL_DAYS']):
-            self.daily()
-            if self.clock.months == 1 and conf.RUN['SAVE_TRANSIT_DATA']:
-                self.output.save_transit_data(self, 'start')
-            if self.clock.new_month:
-                self.monthly()
-            if self.clock.new_quarter:
-                self.quarterly()
-            if self.clock.new_year:
-                self.yearly()
-            self.clock.days += datetime.timedelta(days=1)
+        # Jump from event to event of the calendar: monthly, quarterly and yearly
+        if months is not None:
+            self.scheduler.run(self.clock, after=self.resumed_from, until=self.scheduler.months[months - 1])
+            return
+        self.scheduler.run(self.clock, after=self.resumed_from)
 
         if conf.RUN['PRINT_FINAL_STATISTICS_ABOUT_AGENTS']:
             self.logger.log_outcomes(self)
 
         if conf.RUN['SAVE_TRANSIT_DATA']:
             self.output.save_transit_data(self, 'end')
+        if conf.RUN['CHECKPOINT_MONTHS']:
+            checkpoint.mark_complete(self.output.path)
         self.logger.logger.info('Simulation completed.')
 
+    def save_checkpoint(self):
+        fname = checkpoint.save(self)
+        self.logger.logger.info('Checkpoint saved: {}'.format(fname))
+
+    def restore(self, fname, fork=False):
+        """Restore the state of a run from a checkpoint, instead of initializing it.
+        When forking, the run goes on under its own params instead of those of the checkpoint"""
+        self.logger.logger.info('Restoring from checkpoint: {}'.format(fname))
+        state = checkpoint.load(fname)
+        if fork:
+            state['PARAMS'] = self.PARAMS
+        for key in checkpoint.STATE:
+            setattr(self, key, state[key])
+        self.generator.seed = self.seed
+        self.generator.id_seed = state['id_seed']
+        self.funds.__dict__.update(state['funds'])
+        self.output.restore(state['output'])
+        self.clock.days = self.resumed_from = state['days']
+
     def initialize(self):
         """Initiating simulation"""
         self.logger.logger.info('Initializing...')
         self.grave = []
 
-        self.labor_market = markets.LaborMarket(self.seed)
+        self.labor_market = markets.LaborMarket(self.seed, self.np_seed)
         self.housing = markets.HousingMarket()
-        self.pops, self.total_pop = population.load_pops(self.geo.mun_codes, self.PARAMS, self.geo.year)
+        self.agents = AgentStore()
+        if self.geo.synthetic is None:
+            self.pops, self.total_pop = population.load_pops(self.geo.mun_codes, self.PARAMS, self.geo.year)
+        else:
+            self.pops, self.total_pop = population.prepare_pops(self.geo.synthetic.pops(), self.PARAMS)
         self.regions, self.agents, self.houses, self.families, self.firms, self.central = self.generate()
+        self.houses.attach(self.housing.for_sale, self.housing.rental.vacancies)
+        self.distances = self.houses.distances = make_distances(self.houses, self.regions, self.PARAMS)
         self.construction_firms = {f.id: f for f in self.firms.values() if f.type == 'CONSTRUCTION'}
         self.consumer_firms = {f.id: f for f in self.firms.values() if f.type == 'CONSUMER'}
 
@@ -134,7 +168,8 @@ class Simulation:
             mun_code = region_id[:7]
             self.mun_to_regions[mun_code].add(region_id)
         for mun_code, regions in self.mun_to_regions.items():
-            self.mun_to_regions[mun_code] = list(regions)
+            # Sorted, so that the order does not depend on string hashing
+            self.mun_to_regions[mun_code] = sorted(regions)
 
         # Beginning of simulation, generate a product
         for firm in self.firms.values():
@@ -149,7 +184,7 @@ class Simulation:
         # Simple average of 6 Metropolitan regions Brazil January 2000
         while actual / total > .086:
             self.labor_market.hire_fire(self.firms, self.PARAMS['LABOR_MARKET'])
-            self.labor_market.assign_post(actual_unemployment, None, self.PARAMS)
+            self.labor_market.assign_post(actual_unemployment, None, self.PARAMS, self.distances)
             self.labor_market.look_for_jobs(self.agents)
             actual = self.labor_market.num_candidates
         self.labor_market.reset()
@@ -158,14 +193,21 @@ class Simulation:
         for region in self.regions.values():
             region.pop = self.reg_pops[region.id]
 
-    def daily(self):
-        pass
+    @contextmanager
+    def phase(self, name, count=0):
+        """Timed phase of the month, checked for money conservation when INVARIANT_CHECKS is 'full'"""
+        with self.output.timer(name, count), invariants.conserving(self, name):
+            yield
+
+    def save_transit_start(self):
+        if self.clock.months == 1 and conf.RUN['SAVE_TRANSIT_DATA']:
+            self.output.save_transit_data(self, 'start')
 
     def monthly(self):
+        month = self.clock.month_index
+
         # Set interest rates
-        i = self.interest[self.interest.index.date == self.clock.days]['interest'].iloc[0]
-        m = self.interest[self.interest.index.date == self.clock.days]['mortgage'].iloc[0]
-        self.central.set_interest(i, m)
+        self.central.set_interest(*self.calendar.rates(month))
 
         current_unemployment = self.stats.global_unemployment_rate / 100
 
@@ -177,35 +219,34 @@ class Simulation:
                 region.licenses += self.PARAMS['T_LICENSES_PER_REGION']
 
         # Create new firms according to average historical growth
-        firm_growth(self)
+        with self.phase('firm_growth', len(self.firms)):
+            firm_growth(self)
 
-        # Update firm products
-        for firm in self.firms.values():
-            firm.update_product_quantity(self.PARAMS['PRODUCTIVITY_EXPONENT'],
-                                         self.PARAMS['PRODUCTIVITY_MAGNITUDE_DIVISOR'])
+            # Update firm products
+            for firm in self.firms.values():
+                firm.update_product_quantity(self.PARAMS['PRODUCTIVITY_EXPONENT'],
+                                             self.PARAMS['PRODUCTIVITY_MAGNITUDE_DIVISOR'])
 
         # Call demographics
         # Update agent life cycles
-        for state in self.geo.states_on_process:
-            mortality_men = self.m_men[state]
-            mortality_women = self.m_women[state]
-            fertility = self.f[state]
-
-            state_str = state_string(state, STATES_CODES)
+        with self.phase('demographics', len(self.agents)):
+            for state in self.geo.states_on_process:
+                mortality_men, mortality_women, fertility = self.calendar.demographics(state, month)
 
-            birthdays = defaultdict(list)
-            for agent in self.agents.values():
-                if self.clock.months == agent.month and agent.region_id[:2] == state_str:
-                    birthdays[agent.age].append(agent)
-
-            demographics.check_demographics(self, birthdays, self.clock.year,
-                                            mortality_men, mortality_women, fertility)
+                birthdays = self.agents.birthday(int(state_string(state, STATES_CODES)), self.clock.months)
+                mothers, dead = demographics.check_demographics(self, birthdays,
+                                                                mortality_men, mortality_women, fertility)
+                # Pregnancies come before deaths, as mothers may give birth and die in the same month
+                demographics.births(self, mothers)
+                demographics.deaths(self, dead)
 
         # Adjust population for immigration
-        population.immigration(self)
+        with self.phase('immigration', len(self.agents)):
+            population.immigration(self)
 
         # Adjust families for marriages
-        population.marriage(self)
+        with self.phase('marriage', len(self.agents)):
+            population.marriage(self)
 
         # Firms initialization
         for firm in self.firms.values():
@@ -217,91 +258,103 @@ class Simulation:
         # FAMILIES CONSUMPTION -- using payment received from previous month
         # Equalize money within family members
         # Tax consumption when doing sales are realized
-        markets.goods.consume(self)
+        with self.phase('consumption', len(self.families)):
+            markets.goods.consume(self)
 
         # Collect loan repayments
-        self.central.collect_loan_payments(self)
+        with self.phase('loans', len(self.central.loans)):
+            self.central.collect_loan_payments(self)
 
         # FIRMS
-        for firm in self.firms.values():
-            # Tax workers when paying salaries
-            firm.make_payment(self.regions, current_unemployment,
-                              self.PARAMS['PRODUCTIVITY_EXPONENT'],
-                              self.PARAMS['TAX_LABOR'],
-                              self.PARAMS['WAGE_IGNORE_UNEMPLOYMENT'])
-            # Tax firms before profits: (revenue - salaries paid)
-            firm.pay_taxes(self.regions, self.PARAMS['TAX_FIRM'])
-            # Profits are after taxes
-            firm.calculate_profit()
-            # Check whether it is necessary to update prices
-            firm.update_prices(self.PARAMS['STICKY_PRICES'], self.PARAMS['MARKUP'], self.seed)
+        with self.phase('payroll', len(self.firms)):
+            for firm in self.firms.values():
+                # Tax workers when paying salaries
+                firm.make_payment(self.regions, current_unemployment,
+                                  self.PARAMS['PRODUCTIVITY_EXPONENT'],
+                                  self.PARAMS['TAX_LABOR'],
+                                  self.PARAMS['WAGE_IGNORE_UNEMPLOYMENT'])
+                # Tax firms before profits: (revenue - salaries paid)
+                firm.pay_taxes(self.regions, self.PARAMS['TAX_FIRM'])
+                # Profits are after taxes
+                firm.calculate_profit()
+                # Check whether it is necessary to update prices
+                firm.update_prices(self.PARAMS['STICKY_PRICES'], self.PARAMS['MARKUP'], self.seed)
 
         # Construction firms
-        vacancy = self.stats.calculate_house_vacancy(self.houses, False)
-        vacancy_value = None
-        # Probability depends on size of market
-        if self.PARAMS['OFFER_SIZE_ON_PRICE']:
-            vacancy_value = 1 - (vacancy * self.PARAMS['OFFER_SIZE_ON_PRICE'])
-            if vacancy_value < self.PARAMS['MAX_OFFER_DISCOUNT']:
-                vacancy_value = self.PARAMS['MAX_OFFER_DISCOUNT']
-        for firm in self.construction_firms.values():
-            # See if firm can build a house
-            firm.plan_house(self.regions.values(), self.houses.values(), self.PARAMS, self.seed, vacancy_value)
-            # See whether a house has been completed. If so, register. Else, continue
-            house = firm.build_house(self.regions, self.generator)
-            if house is not None:
-                self.houses[house.id] = house
+        with self.phase('construction', len(self.construction_firms)):
+            vacancy = self.stats.calculate_house_vacancy(self.houses, False)
+            vacancy_value = None
+            # Probability depends on size of market
+            if self.PARAMS['OFFER_SIZE_ON_PRICE']:
+                vacancy_value = 1 - (vacancy * self.PARAMS['OFFER_SIZE_ON_PRICE'])
+                if vacancy_value < self.PARAMS['MAX_OFFER_DISCOUNT']:
+                    vacancy_value = self.PARAMS['MAX_OFFER_DISCOUNT']
+            for firm in self.construction_firms.values():
+                # See if firm can build a house
+                firm.plan_house(self.regions.values(), self.houses.values(), self.PARAMS, self.seed, vacancy_value)
+                # See whether a house has been completed. If so, register. Else, continue
+                house = firm.build_house(self.regions, self.generator)
+                if house is not None:
+                    self.houses[house.id] = house
 
         # Initiating Labor Market
-        # AGENTS
-        self.labor_market.look_for_jobs(self.agents)
+        with self.phase('labor', len(self.agents)):
+            # AGENTS
+            self.labor_market.look_for_jobs(self.agents)
 
-        # FIRMS
-        # Check if new employee needed (functions below)
-        # Check if firing is necessary
-        self.labor_market.hire_fire(self.firms, self.PARAMS['LABOR_MARKET'])
-
-        # Job Matching
-        # Sample used only to calculate wage deciles
-        sample_size = math.floor(len(self.agents) * 0.5)
-        last_wages = [self.agents[a].last_wage
-                      for a in self.seed.sample(self.agents.keys(), sample_size)
-                      if self.agents[a].last_wage is not None]
-        wage_deciles = np.percentile(last_wages, np.arange(0, 100, 10))
-        self.labor_market.assign_post(current_unemployment, wage_deciles, self.PARAMS)
+            # FIRMS
+            # Check if new employee needed (functions below)
+            # Check if firing is necessary
+            self.labor_market.hire_fire(self.firms, self.PARAMS['LABOR_MARKET'])
+
+            # Job Matching
+            # Sample of half the agents used only to calculate wage deciles
+            wage_deciles = self.agents.wage_deciles(self.np_seed)
+            self.labor_market.assign_post(current_unemployment, wage_deciles, self.PARAMS, self.distances)
 
         # Initiating Real Estate Market
         self.logger.logger.info(f'Available licenses: {sum([r.licenses for r in self.regions.values()]):,.0f}')
         # Tax transaction taxes (ITBI) when selling house
         # Property tax (IPTU) collected. One twelfth per month
         # self.central.calculate_monthly_mortgage_rate()
-        self.housing.housing_market(self)
-        self.housing.process_monthly_rent(self)
-        for house in self.houses.values():
-            house.pay_property_tax(self)
+        with self.phase('housing', len(self.houses)):
+            self.housing.housing_market(self)
+        with self.phase('rent', len(self.families)):
+            self.housing.process_monthly_rent(self)
+        with self.phase('property_tax', len(self.houses)):
+            for house in self.houses.values():
+                house.pay_property_tax(self)
 
         # Family investments
-        for fam in self.families.values():
-            fam.invest(self.central.interest, self.central, self.clock.year, self.clock.months)
+        with self.phase('investment', len(self.families)):
+            for fam in self.families.values():
+                fam.invest(self.central.interest, self.central, self.clock.year, self.clock.months)
 
-        # Using all collected taxes to improve public services
-        bank_taxes = self.central.collect_taxes()
+        with self.phase('funds', len(self.regions)):
+            # Using all collected taxes to improve public services
+            bank_taxes = self.central.collect_taxes()
 
-        # Separate funds for region index update and separate for the policy case
-        self.funds.invest_taxes(self.clock.year, bank_taxes)
+            # Separate funds for region index update and separate for the policy case
+            self.funds.invest_taxes(month, bank_taxes)
 
-        # Apply policies if percentage is different than 0
-        if self.PARAMS['POLICY_COEFFICIENT']:
-            self.funds.apply_policies()
+            # Apply policies if percentage is different than 0
+            if self.PARAMS['POLICY_COEFFICIENT']:
+                self.funds.apply_policies()
 
-        # Pass monthly information to be stored in Statistics
-        self.output.save_stats_report(self, bank_taxes)
+        with self.phase('stats', len(self.agents)):
+            # Pass monthly information to be stored in Statistics
+            self.output.save_stats_report(self, bank_taxes)
 
-        # Getting regional GDP
-        self.output.save_regional_report(self)
+            # Getting regional GDP
+            self.output.save_regional_report(self)
 
-        if conf.RUN['SAVE_AGENTS_DATA'] == 'MONTHLY':
-            self.output.save_data(self)
+        with self.phase('output', len(self.agents)):
+            if conf.RUN['SAVE_AGENTS_DATA'] == 'MONTHLY':
+                self.output.save_data(self)
+
+        self.output.save_time_report(self)
+
+        invariants.check_month(self)
 
         if conf.RUN['PRINT_STATISTICS_AND_RESULTS_DURING_PROCESS']:
             self.logger.info(self.clock.days)
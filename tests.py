@@ -1,5 +1,9 @@
 import conf
+import copy
+import math
+import os
 import tempfile
+import main
 from simulation import Simulation
 
 
@@ -12,6 +16,8 @@ print('Verifying...')
 
 # Keep it short
 conf.RUN['TOTAL_DAYS'] = 100
+# Check money, ownership and population counts every month
+conf.RUN['INVARIANT_CHECKS'] = 'full'
 
 path = tempfile.gettempdir()
 sim = Simulation(conf.PARAMS, path)
@@ -26,6 +32,49 @@ check('Bank is loaning money', lambda sim: sim.central.n_loans() > 0)
 check('No families without a house', lambda sim: len([f for f in sim.families.values() if f.house is None]) == 0)
 
 
+# Permanent income over a window is the mean of the incomes of the last months only
+family = next(iter(sim.families.values()))
+family.income_sum, family.income_count, family.last_incomes = 0, 0, None
+incomes, permanent = [], []
+for month in range(30):
+    family.savings += 1000 * month
+    permanent.append(family.permanent_income(sim.central, sim.central.interest, window=12))
+    incomes.append(family.last_incomes[-1])
+check('Permanent income is the mean of the last incomes',
+      lambda sim: all(math.isclose(p, sum(incomes[max(0, m - 11):m + 1]) / min(m + 1, 12))
+                      for m, p in enumerate(permanent)))
+
+
+# A run that loads the population saved by the run before goes on with ids that are not in use
+conf.RUN['FORCE_NEW_POPULATION'] = False
+for run in range(2):
+    sim = Simulation(conf.PARAMS, path)
+    sim.initialize()
+    sim.run()
+check('Loaded population gets new ids',
+      lambda sim: len(set(sim.houses) | set(sim.families) | set(sim.firms))
+      == len(sim.houses) + len(sim.families) + len(sim.firms))
+
+
+# A run forked from a prefix run under another policy reproduces the full run, once policies start
+conf.RUN['PLOT_EACH_RUN'] = False
+fork_path = tempfile.mkdtemp()
+params = copy.deepcopy(conf.PARAMS)
+params.update({'TOTAL_DAYS': 450, 'POLICIES': 'rent'})
+main.single_run(copy.deepcopy(params), os.path.join(fork_path, 'full'))
+prefix = main.fork_prefixes([params, dict(params, POLICIES='wage')], 6)[0]
+main.prefix_run(prefix, os.path.join(fork_path, 'prefix'), 6)
+main.fork_run(copy.deepcopy(params), os.path.join(fork_path, 'prefix'), os.path.join(fork_path, 'fork'))
+
+
+def stats(run):
+    with open(os.path.join(fork_path, run, 'temp_stats.csv')) as f:
+        return f.read()
+
+
+check('Forked run reproduces the full run', lambda sim: stats('fork') == stats('full'))
+
+
 conf.PARAMS['PERCENT_CONSTRUCTION_FIRMS'] = 0.0
 sim = Simulation(conf.PARAMS, path)
 sim.initialize()
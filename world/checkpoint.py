@@ -0,0 +1,72 @@
+"""
+Checkpoints of the full state of a simulation run, taken at month boundaries.
+A run that crashes or is killed may be resumed from its latest checkpoint and,
+given the same code and inputs, continues exactly as the uninterrupted run would.
+"""
+import glob
+import gzip
+import os
+import pickle
+
+CHECKPOINT_DIR = 'checkpoints'
+COMPLETE = 'complete'
+
+# Simulation attributes that make up the state of a run.
+# They are pickled together, so that objects shared among them (the random generator, families held by the bank
+# or by the policy registries, houses for sale...) are still shared once restored.
+STATE = ['PARAMS', 'seed', 'np_seed', 'agents', 'houses', 'families', 'firms', 'construction_firms', 'consumer_firms',
+         'regions', 'central', 'labor_market', 'housing', 'stats', 'grave', 'mun_pops', 'reg_pops', 'total_pop',
+         'mun_to_regions', 'distances']
+
+
+def checkpoint_dir(output_path):
+    return os.path.join(output_path, CHECKPOINT_DIR)
+
+
+def save(sim):
+    """Snapshot the simulation at the current date, replacing the previous checkpoint of the run"""
+    path = checkpoint_dir(sim.output.path)
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+    state = {key: getattr(sim, key) for key in STATE}
+    state['days'] = sim.clock.days
+    state['funds'] = {k: v for k, v in vars(sim.funds).items() if k != 'sim'}
+    state['id_seed'] = sim.generator.id_seed
+    state['output'] = sim.output.snapshot()
+
+    fname = os.path.join(path, '{}.pkl.gz'.format(sim.clock.days))
+    # Write to a temporary file first, so that a crash while saving never leaves a broken checkpoint behind
+    with gzip.open(fname + '.tmp', 'wb', compresslevel=5) as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(fname + '.tmp', fname)
+
+    for old in glob.glob(os.path.join(path, '*.pkl.gz')):
+        if old != fname:
+            os.remove(old)
+    return fname
+
+
+def load(fname):
+    with gzip.open(fname, 'rb') as f:
+        return pickle.load(f)
+
+
+def latest(output_path):
+    """Path to the latest checkpoint of a run, if any"""
+    checkpoints = sorted(glob.glob(os.path.join(checkpoint_dir(output_path), '*.pkl.gz')))
+    return checkpoints[-1] if checkpoints else None
+
+
+def mark_complete(output_path):
+    """Flag the run as finished. Its checkpoints are no longer needed"""
+    path = checkpoint_dir(output_path)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    for old in glob.glob(os.path.join(path, '*.pkl.gz')):
+        os.remove(old)
+    open(os.path.join(path, COMPLETE), 'w').close()
+
+
+def is_complete(output_path):
+    return os.path.exists(os.path.join(checkpoint_dir(output_path), COMPLETE))
@@ -1,6 +1,9 @@
 import datetime
 from math import ceil
 
+# Months in which a new quarter starts
+QUARTER_MONTHS = {1, 5, 9}
+
 
 class Clock:
     """
@@ -8,6 +11,7 @@ class Clock:
     """
 
     def __init__(self, days=datetime.date(2000, 1, 1)):
+        self.start = days
         self.days = days
 
     @property
@@ -25,6 +29,11 @@ class Clock:
     def months(self):
         return self.days.month
 
+    @property
+    def month_index(self):
+        """Months elapsed since the month the clock started"""
+        return (self.days.year - self.start.year) * 12 + self.days.month - self.start.month
+
     @property
     def quarters(self):
         return "Q%d_%d" % (ceil(self.days.month / 3), self.days.year)
@@ -35,7 +44,7 @@ class Clock:
 
     @property
     def new_quarter(self):
-        return (self.days.day == 1) and (self.days.month in {1, 5, 9})
+        return (self.days.day == 1) and (self.days.month in QUARTER_MONTHS)
 
     @property
     def new_year(self):
@@ -1,75 +1,67 @@
-from agents import Agent
+import numpy as np
+
+from . import invariants
 from .population import marriage_data
 
 # Importing official Data from IBGE, 2000-2030
 # NOTE: There are different DATA available for each year 2000-2030 for each State
 
 
-def check_demographics(sim, birthdays, year, mortality_men, mortality_women, fertility):
-    """Agent life cycles: update agent ages, deaths, and births"""
-    births, deaths = [], 0
-    for age, agents in birthdays.items():
-        age = age + 1
-        prob_mort_m = mortality_men.get_group(age)[str(year)].iloc[0]
-        prob_mort_f = mortality_women.get_group(age)[str(year)].iloc[0]
-        if 14 < age < 50:
-            p_pregnancy = fertility.get_group(age)[str(year)].iloc[0]
-
-        for agent in agents:
-            agent.age += 1
-            agent.p_marriage = marriage_data.p_marriage(agent)
-            if agent.gender == 'Male':
-                if sim.seed.random() < prob_mort_m:
-                    die(sim, agent)
-                    deaths += 1
-
-            else:
-                if 14 < age < 50:
-                    child = pregnant(sim, agent, p_pregnancy)
-                    if child is not None:
-                        births.append(child)
-
-                # Mortality procedures
-                # Extract specific agent data to calculate mortality 'Female'
-                if sim.seed.random() < prob_mort_f:
-                    die(sim, agent)
-                    deaths += 1
-    return births, deaths
-
-
-def birth(sim):
-    """Similar to create agent, but just one individual"""
-    age = 0
-    qualification = int(sim.seed.gammavariate(3, 3))
-    qualification = [qualification if qualification < 21 else 20][0]
-    money = sim.seed.randrange(20, 40)
-    month = sim.seed.randrange(1, 13, 1)
-    gender = sim.seed.choice(['Male', 'Female'])
-    sim.total_pop += 1
-    a = Agent((sim.total_pop - 1), gender, age, qualification, money, month)
-    return a
-
-
-def pregnant(sim, agent, p_pregnancy):
-    """An agent is born"""
-    if sim.seed.random() < p_pregnancy:
-        child = birth(sim)
-        agent.family.add_agent(child)
+def check_demographics(sim, rows, mortality_men, mortality_women, fertility):
+    """Agent life cycles of a birthday cohort (rows of sim.agents, already one year older, see
+    AgentStore.birthday): draw deaths and births for the whole cohort at once.
+    Mortality and fertility are the month's probabilities indexed by age.
+    Returns the rows of the mothers and the rows of the dead, to be applied by births and deaths"""
+    agents = sim.agents
+    age = agents.age[rows]
+    male = agents.male(rows)
+    agents.p_marriage[rows] = marriage_data.p_marriage_of(male, age)
+
+    # Oldest age available holds for anyone older
+    p_death = np.where(male,
+                       mortality_men[np.minimum(age, len(mortality_men) - 1)],
+                       mortality_women[np.minimum(age, len(mortality_women) - 1)])
+    fertile = ~male & (14 < age) & (age < 50)
+    p_pregnancy = np.zeros(len(rows))
+    p_pregnancy[fertile] = fertility[age[fertile]]
+
+    draws = sim.np_seed.random((2, len(rows)))
+    return rows[draws[0] < p_pregnancy], rows[draws[1] < p_death]
+
+
+def births(sim, mothers):
+    """A child is born to each of the mothers (rows of sim.agents), into their families"""
+    n = len(mothers)
+    qualification = np.minimum(sim.np_seed.gamma(3, 3, n).astype(int), 20)
+    money = sim.np_seed.integers(20, 40, n)
+    month = sim.np_seed.integers(1, 13, n)
+    gender = sim.np_seed.choice(sim.agents.GENDERS, n)
+    sim.total_pop += n
+    children = sim.agents.create_many(gender, np.zeros(n, dtype=int), qualification, money, month)
+    for mother, child in zip(mothers.tolist(), children):
+        sim.agents[mother].family.add_agent(child)
         sim.agents[child.id] = child
         sim.update_pop(None, child.region_id)
-        return child
+    return children
+
+
+def deaths(sim, dead):
+    """Agents (rows of sim.agents) die"""
+    for row in dead.tolist():
+        die(sim, sim.agents[row])
 
 
 def die(sim, agent):
     """An agent dies"""
     sim.grave.append(agent)
+    region_id = agent.region_id
 
     # This makes the house vacant if all members of a given family have passed
     if agent.family.num_members == 1:
         # Save houses of empty family
         id = agent.family.id
-        inheritance = [h for h in sim.houses.values() if h.owner_id == id]
-        to_empty = [h for h in sim.houses.values() if h.family_id == id]
+        inheritance = sim.houses.owned_by(id)
+        to_empty = sim.houses.occupied_by(id)
         for each in to_empty:
             each.family_id = None
             each.rent_data = None
@@ -81,11 +73,11 @@ def die(sim, agent):
         # Eliminate families with no members
         id = agent.family.id
         del sim.families[id]
-        unassigned_houses = [h for h in sim.houses.values() if h.owner_id == id]
-        assert len(unassigned_houses) == 0
+        if invariants.enabled('cheap'):
+            assert not sim.houses.owned_by(id)
 
         savings = agent.family.grab_savings(sim.central, sim.clock.year, sim.clock.months)
-        relatives = [sim.families[i] for i in agent.family.relatives if i in sim.families]
+        relatives = [sim.families[i] for i in sorted(agent.family.relatives) if i in sim.families]
 
         # Redistribute houses, debt, and savings of empty family
         if relatives:
@@ -128,8 +120,7 @@ def die(sim, agent):
 
     if agent.is_employed:
         sim.firms[agent.firm_id].obit(agent)
-    if agent.family is not None:
-        sim.update_pop(agent.region_id, None)
+    sim.update_pop(region_id, None)
 
     a_id = agent.id
     del sim.agents[a_id]
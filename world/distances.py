@@ -0,0 +1,128 @@
+"""
+Distances between houses and firms, shared by the goods and labor markets and commuting.
+Coordinates are kept in NumPy arrays, so that many distances are computed at once,
+instead of caching each pair of house and firm. Distances are either between addresses (Distances)
+or, for large runs, between their regions (RegionDistances), by the DISTANCES param.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class Distances:
+    """
+    Euclidean distances (in the units of the addresses) between the houses of a HouseRegistry,
+    by their x and y columns, and firms, whose coordinates are added the first time they are asked for.
+    Houses and firms never move, so new firms (firm growth) and new houses (construction) are all there is to add.
+    """
+    def __init__(self, houses, capacity=256):
+        self.houses = houses
+        # Firm id -> row in the coordinate arrays
+        self.firms = {}
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+
+    def firm_row(self, firm):
+        row = self.firms.get(firm.id)
+        if row is None:
+            row = len(self.firms)
+            if row == len(self.x):
+                self.x = np.concatenate([self.x, np.zeros(len(self.x))])
+                self.y = np.concatenate([self.y, np.zeros(len(self.y))])
+            self.x[row] = firm.address.x
+            self.y[row] = firm.address.y
+            self.firms[firm.id] = row
+        return row
+
+    def between(self, house, firm):
+        row = self.firm_row(firm)
+        dx = self.houses.x.item(house.row) - self.x.item(row)
+        dy = self.houses.y.item(house.row) - self.y.item(row)
+        return math.sqrt(dx * dx + dy * dy)
+
+    def pairs(self, house_rows, firm_rows):
+        """Distances of each house (registry rows) to the firm (rows of firm_row) in the same position"""
+        dx = self.houses.x[house_rows] - self.x[firm_rows]
+        dy = self.houses.y[house_rows] - self.y[firm_rows]
+        return np.sqrt(dx * dx + dy * dy)
+
+    def to_firms(self, house, firms):
+        """Distances of the house to each of the firms"""
+        rows = np.fromiter((self.firm_row(f) for f in firms), dtype=np.int64, count=len(firms))
+        return self.pairs(np.full(len(rows), house.row), rows)
+
+
+class RegionDistances:
+    """
+    Distances between the regions of houses and firms, from a (region x region) matrix of travel costs,
+    by position of the regions. Memory is that of the matrix, whatever the number of houses and firms,
+    and no address is needed once the matrix is made.
+    """
+    def __init__(self, houses, region_ids, matrix, capacity=256):
+        self.houses = houses
+        self.positions = {r: i for i, r in enumerate(region_ids)}
+        self.matrix = matrix
+        # Position of the region of each code of the house registry (see HouseRegistry.region_code)
+        self.codes = np.zeros(0, dtype=np.int64)
+        # Firm id -> row in `regions`, position of the region of each firm
+        self.firms = {}
+        self.regions = np.zeros(capacity, dtype=np.int64)
+
+    @classmethod
+    def from_centroids(cls, houses, regions):
+        """Euclidean distances between the centroids of the regions, in the units of the addresses"""
+        ids = list(regions)
+        centroids = np.array([(c.x, c.y) for c in (regions[r].addresses.centroid for r in ids)])
+        dx = centroids[:, 0][:, None] - centroids[:, 0][None, :]
+        dy = centroids[:, 1][:, None] - centroids[:, 1][None, :]
+        return cls(houses, ids, np.sqrt(dx * dx + dy * dy).astype(np.float32))
+
+    @classmethod
+    def from_csv(cls, houses, regions, path):
+        """Matrix with the ids of origin regions in the first column and of destination regions in the header"""
+        ids = list(regions)
+        df = pd.read_csv(path, index_col=0)
+        df.index = df.index.astype(str)
+        df.columns = df.columns.astype(str)
+        missing = set(ids) - (set(df.index) & set(df.columns))
+        if missing:
+            raise ValueError('Regions missing in the commute matrix {}: {}'.format(path, sorted(missing)))
+        return cls(houses, ids, df.loc[ids, ids].to_numpy(dtype=np.float32))
+
+    def firm_row(self, firm):
+        row = self.firms.get(firm.id)
+        if row is None:
+            row = len(self.firms)
+            if row == len(self.regions):
+                self.regions = np.concatenate([self.regions, np.zeros(len(self.regions), dtype=np.int64)])
+            self.regions[row] = self.positions[firm.region_id]
+            self.firms[firm.id] = row
+        return row
+
+    def house_regions(self, house_rows):
+        if len(self.codes) < len(self.houses.region_ids):
+            self.codes = np.array([self.positions[r] for r in self.houses.region_ids], dtype=np.int64)
+        return self.codes[self.houses.region[house_rows]]
+
+    def between(self, house, firm):
+        return self.matrix.item(self.house_regions(house.row), self.regions.item(self.firm_row(firm)))
+
+    def pairs(self, house_rows, firm_rows):
+        return self.matrix[self.house_regions(house_rows), self.regions[firm_rows]].astype(np.float64)
+
+    def to_firms(self, house, firms):
+        rows = np.fromiter((self.firm_row(f) for f in firms), dtype=np.int64, count=len(firms))
+        return self.pairs(np.full(len(rows), house.row), rows)
+
+
+def make_distances(houses, regions, params):
+    """Distances service of a simulation, by DISTANCES (and COMMUTE_MATRIX) params"""
+    mode = params.get('DISTANCES', 'points')
+    if mode == 'points':
+        return Distances(houses)
+    if mode == 'regions':
+        if params.get('COMMUTE_MATRIX'):
+            return RegionDistances.from_csv(houses, regions, params['COMMUTE_MATRIX'])
+        return RegionDistances.from_centroids(houses, regions)
+    raise ValueError("DISTANCES must be 'points' or 'regions', not {!r}".format(mode))
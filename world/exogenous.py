@@ -0,0 +1,109 @@
+"""
+Exogenous time series used along the run (interest, mortality, fertility and FPM).
+They are read once, when the simulation is set up, and kept as NumPy arrays indexed by
+the month offset of the run (see Clock.month_index), by age and by municipality,
+so that the monthly step only does array reads.
+"""
+import numpy as np
+import pandas as pd
+
+# Last year with FPM data available. Later years repeat it
+LAST_FPM_YEAR = 2016
+
+
+def month_offset(start, day):
+    """Number of months between the month of `start` and the month of `day`"""
+    return (day.year - start.year) * 12 + day.month - start.month
+
+
+def by_age(table, years, n_ages):
+    """Dense (year x age) array from an IBGE table with an 'age' column and one column per year.
+    Ages not in the table have probability 0"""
+    dense = np.zeros((len(years), n_ages))
+    ages = table['age'].values.astype(int)
+    for i, year in enumerate(years):
+        dense[i, ages] = table[str(year)].values
+    return dense
+
+
+class ExogenousCalendar:
+    def __init__(self, params, geo, months):
+        self.start = params['STARTING_DAY']
+        self.months = months
+        n_months = month_offset(self.start, months[-1]) + 1 if months else 0
+        # Calendar year of each month offset
+        self.years = np.array([self.start.year + (self.start.month - 1 + m) // 12 for m in range(n_months)],
+                              dtype=int)
+
+        # Interest
+        # Average interest rate - Earmarked new operations - Households - Real estate financing - Market rates
+        # PORT. Taxa média de juros das operações de crédito com recursos direcionados - Pessoas físicas -
+        # Financiamento imobiliário com taxas de mercado. BC series 433. 25497. 4390.
+        # Values before 2011-03-01 when the series began are set at the value of 2011-03-01. After, mean.
+        if geo.synthetic is None:
+            interest = pd.read_csv(f"input/interest_{params['INTEREST']}.csv", sep=';')
+        else:
+            interest = geo.synthetic.interest()
+        interest.date = pd.to_datetime(interest.date).dt.date
+        interest = interest.set_index('date')
+        interest = interest[~interest.index.duplicated()]
+        self.interest = np.full(n_months, np.nan)
+        self.mortgage = np.full(n_months, np.nan)
+        for day in months:
+            if day not in interest.index:
+                raise ValueError('No {} interest rate available for {}'.format(params['INTEREST'], day))
+            m = month_offset(self.start, day)
+            self.interest[m] = interest.loc[day, 'interest']
+            self.mortgage[m] = interest.loc[day, 'mortgage']
+
+        # Mortality and fertility, by state. Each is a (month x age) array
+        self.mortality_men, self.mortality_women, self.fertility = {}, {}, {}
+        for state in geo.states_on_process:
+            if geo.synthetic is None:
+                men = pd.read_csv('input/mortality/mortality_men_%s.csv' % state, sep=';', header=0, decimal='.')
+                women = pd.read_csv('input/mortality/mortality_women_%s.csv' % state, sep=';', header=0, decimal='.')
+                fertility = pd.read_csv('input/fertility/fertility_%s.csv' % state, sep=';', header=0, decimal='.')
+            else:
+                men, women = geo.synthetic.mortality('male'), geo.synthetic.mortality('female')
+                fertility = geo.synthetic.fertility()
+            year_cols = sorted(int(c) for c in men.columns if c != 'age')
+            # Years after the last available one repeat the last available one
+            years = np.clip(self.years, year_cols[0], year_cols[-1])
+            n_ages = int(men['age'].max()) + 1
+            self.mortality_men[state] = by_age(men, years, n_ages)
+            self.mortality_women[state] = by_age(women, years, n_ages)
+            self.fertility[state] = by_age(fertility, years, n_ages)
+
+        # FPM by municipality. A (month x municipality) array
+        self.fpm_index = {}
+        self.fpm = None
+        if params['FPM_DISTRIBUTION']:
+            if geo.synthetic is None:
+                fpm = pd.concat([pd.read_csv('input/fpm/%s.csv' % state, sep=',', header=0, decimal='.',
+                                             encoding='latin1')[['ano', 'cod', 'fpm']]
+                                 for state in geo.states_on_process])
+            else:
+                fpm = geo.synthetic.fpm()
+            fpm = fpm[fpm.cod.isin([int(m) for m in geo.mun_codes])]
+            fpm = fpm.groupby([fpm.cod.astype(int), fpm.ano.astype(int)]).fpm.first()
+            mun_codes = sorted(set(str(c) for c, _ in fpm.index))
+            self.fpm_index = {mun_code: i for i, mun_code in enumerate(mun_codes)}
+            self.fpm = np.full((n_months, len(mun_codes)), np.nan)
+            for m, year in enumerate(np.minimum(self.years, LAST_FPM_YEAR)):
+                for mun_code, i in self.fpm_index.items():
+                    self.fpm[m, i] = fpm.get((int(mun_code), int(year)), np.nan)
+
+    def rates(self, month):
+        """Interest and mortgage rates of the month"""
+        return self.interest[month], self.mortgage[month]
+
+    def demographics(self, state, month):
+        """Mortality of men, women and fertility of the month, each indexed by age"""
+        return self.mortality_men[state][month], self.mortality_women[state][month], self.fertility[state][month]
+
+    def fpm_of(self, mun_code, month):
+        """Actual FPM received by the municipality in the year of the month"""
+        value = self.fpm[month, self.fpm_index[mun_code]] if mun_code in self.fpm_index else np.nan
+        if np.isnan(value):
+            raise KeyError('No FPM data for municipality {} in {}'.format(mun_code, self.years[month]))
+        return value
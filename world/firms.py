@@ -6,12 +6,17 @@ import pandas as pd
 
 class FirmData:
     """ Firm growth is estimated from a monthly value of growth observed between the years of 2000 and 2012 """
-    def __init__(self, year):
+    def __init__(self, year, synthetic=None):
         # Using APs code of year 2000 (they are not compatible with year 2010 APs)
         # If year == 2000, data refers to years 2002 and 2012
         # If year == 2010, data refers to years 2010 and 2017
-        self.num_emp_t0 = self._load(f'input/firms_by_APs{year}_t0_full.csv')
-        self.num_emp_t1 = self._load(f'input/firms_by_APs{year}_t1_full.csv')
+        if synthetic is None:
+            num_emp_aps_t0 = pd.read_csv(f'input/firms_by_APs{year}_t0_full.csv', sep=';')
+            num_emp_aps_t1 = pd.read_csv(f'input/firms_by_APs{year}_t1_full.csv', sep=';')
+        else:
+            num_emp_aps_t0, num_emp_aps_t1 = synthetic.firms()
+        self.num_emp_t0 = self._load(num_emp_aps_t0)
+        self.num_emp_t1 = self._load(num_emp_aps_t1)
 
         self.deltas = {}
         self.avg_monthly_deltas = {}
@@ -25,9 +30,8 @@ class FirmData:
                 num_months = 12 * 7
             self.avg_monthly_deltas[mun_code] = delta/num_months
 
-    def _load(self, fname):
+    def _load(self, num_emp_aps):
         """ Returns the sum of firms of each AP by municipality (all APs summed) """
-        num_emp_aps = pd.read_csv(fname, sep=';')
         num_emp = defaultdict(int)
         for idx, row in num_emp_aps.iterrows():
             mun_code = int(str(row['AP'])[:7])
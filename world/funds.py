@@ -1,22 +1,26 @@
 import datetime
 from collections import defaultdict
 
-import pandas as pd
 import numpy as np
 
+from analysis.groups import Groups
 from markets.housing import HousingMarket
 from .geography import STATES_CODES, state_string
 
+# Policies that gather a share of the taxes into policy_money and apply it once they start
+POLICIES = ['buy', 'rent', 'wage']
+
+
+def policies_start(params):
+    """Policies are implemented only after the first year of the simulation run"""
+    return params['STARTING_DAY'] + datetime.timedelta(360)
+
 
 class Funds:
     def __init__(self, sim):
         self.sim = sim
         self.families_subsided = 0
         self.money_applied_policy = 0
-        if sim.PARAMS['FPM_DISTRIBUTION']:
-            self.fpm = {
-                state: pd.read_csv('input/fpm/%s.csv' % state, sep=',', header=0, decimal='.', encoding='latin1')
-                for state in self.sim.geo.states_on_process}
         if sim.PARAMS['POLICY_COEFFICIENT']:
             # Gather the money by municipality. Later gather the families and act upon policy!
             self.policy_money = defaultdict(float)
@@ -25,14 +29,15 @@ class Funds:
 
     def update_policy_families(self):
         # Entering the list this month
-        incomes = [f.get_permanent_income() for f in self.sim.families.values()]
+        families = list(self.sim.families.values())
+        incomes = [f.get_permanent_income() for f in families]
         quantile = np.quantile(incomes, self.sim.PARAMS['POLICY_QUANTILE'])
+        poorest = [f for f, income in zip(families, incomes) if income < quantile]
+        by_region = Groups([f.house.region_id for f in poorest]).split(poorest)
         for region in self.sim.regions.values():
             # Unemployed, Default on rent from the region
-            self.sim.regions[region.id].registry[self.sim.clock.days] += [f for f in self.sim.families.values()
-                                                                          if f.get_permanent_income() < quantile
-                                                                          and f.house.region_id == region.id]
-        if self.sim.clock.days < self.sim.PARAMS['STARTING_DAY'] + datetime.timedelta(360):
+            region.registry[self.sim.clock.days] += by_region.get(region.id, [])
+        if self.sim.clock.days < policies_start(self.sim.PARAMS):
             return
         # Entering the policy list. Includes families for past months as well
         for region in self.sim.regions.values():
@@ -43,18 +48,19 @@ class Funds:
             # Make sure families on the list are still valid families, residing at the municipality
             self.policy_families[mun] = [f for f in self.policy_families[mun]
                                          if f.id in self.sim.families.keys() and f.house.region_id[:7] == mun]
-            self.policy_families[mun] = list(set(f for f in self.policy_families[mun]))
+            # Drop duplicates, keeping the order of registration
+            self.policy_families[mun] = list(dict.fromkeys(self.policy_families[mun]))
             self.policy_families[mun] = sorted(self.policy_families[mun], key=lambda f: f.get_permanent_income())
 
     def apply_policies(self):
-        if self.sim.PARAMS['POLICIES'] not in ['buy', 'rent', 'wage']:
+        if self.sim.PARAMS['POLICIES'] not in POLICIES:
             # Baseline scenario. Do nothing!
             return
         # Reset indicator every month to reflect subside in a given month, not cumulatively
         self.families_subsided = 0
         self.update_policy_families()
         # Implement policies only after first year of simulation run
-        if self.sim.clock.days < self.sim.PARAMS['STARTING_DAY'] + datetime.timedelta(360):
+        if self.sim.clock.days < policies_start(self.sim.PARAMS):
             return
         if self.sim.PARAMS['POLICIES'] == 'buy':
             self.buy_houses_give_to_families()
@@ -138,22 +144,16 @@ class Funds:
         # Clean up list for next month
         self.temporary_houses = defaultdict(list)
 
-    def distribute_fpm(self, value, regions, pop_t, pop_mun_t, year):
+    def distribute_fpm(self, value, regions, pop_t, pop_mun_t, month):
         """Calculate proportion of FPM per region, in relation to the total of all regions.
         Value is the total value of FPM to distribute"""
-        if float(year) > 2016:
-            year = str(2016)
-
         # Dictionary that keeps actual FPM received to be used as a proportion parameter
         # to simulated FPM to be distributed
         fpm_region = {}
-        states_numbers = [state_string(state, STATES_CODES) for state in self.sim.geo.states_on_process]
-        for i, state in enumerate(self.sim.geo.states_on_process):
-            for id, region in regions.items():
-                if region.id[:2] == states_numbers[i]:
-                    mun_code = region.id[:7]
-                    fpm_region[id] = self.fpm[state][(self.fpm[state].ano == float(year)) &
-                                                     (self.fpm[state].cod == float(mun_code))].fpm.iloc[0]
+        states_numbers = set(state_string(state, STATES_CODES) for state in self.sim.geo.states_on_process)
+        for id, region in regions.items():
+            if region.id[:2] in states_numbers:
+                fpm_region[id] = self.sim.calendar.fpm_of(region.id[:7], month)
 
         for id, region in regions.items():
             mun_code = region.id[:7]
@@ -191,8 +191,8 @@ class Funds:
             region.update_index(amount * self.sim.PARAMS['MUNICIPAL_EFFICIENCY_MANAGEMENT'])
             region.update_applied_taxes(amount, 'equally')
 
-    def invest_taxes(self, year, bank_taxes):
-        if self.sim.PARAMS['POLICIES'] not in ['buy', 'rent', 'wage']:
+    def invest_taxes(self, month, bank_taxes):
+        if self.sim.PARAMS['POLICIES'] not in POLICIES:
             self.sim.PARAMS['POLICY_COEFFICIENT'] = 0
         # Collect and UPDATE pop_t-1 and pop_t
         regions = self.sim.regions
@@ -238,7 +238,8 @@ class Funds:
         if self.sim.PARAMS['FPM_DISTRIBUTION']:
             v_fpm = (sum([treasure[key]['labor'] for key in treasure.keys()]) +
                      sum([treasure[key]['firm'] for key in treasure.keys()]))
-            self.distribute_fpm(v_fpm * self.sim.PARAMS['TAXES_STRUCTURE']['fpm'], regions, pop_t, pop_mun_t, year)
+            self.distribute_fpm(v_fpm * self.sim.PARAMS['TAXES_STRUCTURE']['fpm'], regions, pop_t, pop_mun_t,
+                                month)
             v_equal += v_fpm * (1 - self.sim.PARAMS['TAXES_STRUCTURE']['fpm'])
         else:
             v_equal += (sum([treasure[key]['labor'] for key in treasure.keys()]) +
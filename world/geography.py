@@ -24,8 +24,18 @@ def process_acps(acps):
 
 class Geography:
     """Manages which ACPs/states/municipalities are used for the simulation"""
-    def __init__(self, params, year):
+    def __init__(self, params, year, synthetic=None):
         self.year = year
+        # Made-up world (see synthetic.py), used instead of the ACPs in PROCESSING_ACPS
+        self.synthetic = synthetic
+        if synthetic is not None:
+            self.processing_acps_codes, self.processing_acps, self.states_on_process = synthetic.acps()
+            self.mun_codes = list(synthetic.mun_codes)
+            self.list_of_acps = list(self.processing_acps)
+            self.mun_to_acp = {str(mun): synthetic.name for mun in self.mun_codes}
+            self.LIST_NAMES_MUN = synthetic.names()
+            return
+
         # Processing the chosen ACPs
         self.processing_acps_codes, self.processing_acps, self.states_on_process = \
             process_acps(params['PROCESSING_ACPS'])
@@ -35,8 +45,13 @@ class Geography:
         mun_codes = []
 
         # Selecting the municipalities' codes from list
+        # ACP of each municipality, as a string code
+        self.mun_to_acp = {}
         for acp in self.processing_acps:
-            mun_codes += list(ACPS_MUN_CODES.loc[ACPS_MUN_CODES['ACPs'] == acp, ]['cod_mun'])
+            acp_mun_codes = list(ACPS_MUN_CODES.loc[ACPS_MUN_CODES['ACPs'] == acp, ]['cod_mun'])
+            mun_codes += acp_mun_codes
+            for mun in acp_mun_codes:
+                self.mun_to_acp.setdefault(str(mun), acp)
 
         self.mun_codes = list(set(mun_codes))
 
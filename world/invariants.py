@@ -0,0 +1,111 @@
+"""
+Consistency checks of the state of the simulation, by level of conf.RUN['INVARIANT_CHECKS']:
+'off' skips them all; 'cheap' runs those that cost little where they are;
+'full' also runs those that scan houses or agents, and the global checks at the end of each month:
+money conservation, ownership and occupancy of houses, houses on the market, population counts
+and the pool of unemployed agents.
+"""
+from collections import Counter
+from contextlib import contextmanager
+
+import conf
+
+LEVELS = ['off', 'cheap', 'full']
+
+# Phases of the month that move money among agents, families, firms, bank, regions and funds
+# without creating or destroying it. Other phases do, e.g. births, immigration, FPM and the interest on deposits
+# that families withdraw (when consuming or paying loans). Housing does too, by a little, as the change of
+# each purchase is rounded to cents
+CONSERVING_PHASES = {'payroll', 'construction', 'labor', 'property_tax', 'investment'}
+
+# Relative tolerance for money conservation, as sums of floats are not exact
+MONEY_TOLERANCE = 1e-9
+
+
+def enabled(level):
+    """Whether checks of `level` ('cheap' or 'full') are on"""
+    return LEVELS.index(conf.RUN.get('INVARIANT_CHECKS', 'cheap')) >= LEVELS.index(level)
+
+
+def money_stock(sim):
+    """All the money in the simulation: cash of agents, savings of families, balance of firms and of the bank,
+    taxes held by the bank, regions' treasure and funds for policies"""
+    agents = sim.agents
+    return (agents.money[agents.rows()].sum()
+            + sum(f.savings for f in sim.families.values())
+            + sum(f.total_balance for f in sim.firms.values())
+            + sim.central.balance + sim.central.taxes
+            + sum(r.total_treasure for r in sim.regions.values())
+            # Funds for policies are gathered only with a POLICY_COEFFICIENT
+            + sum(getattr(sim.funds, 'policy_money', {}).values()))
+
+
+@contextmanager
+def conserving(sim, phase):
+    """Check that the phase does not change the money stock, if it is one of CONSERVING_PHASES"""
+    if phase not in CONSERVING_PHASES or not enabled('full'):
+        yield
+        return
+    before = money_stock(sim)
+    yield
+    after = money_stock(sim)
+    assert abs(after - before) <= MONEY_TOLERANCE * max(abs(before), 1), \
+        'Money not conserved in {}: {} before, {} after'.format(phase, before, after)
+
+
+def check_ownership(sim):
+    for house in sim.houses.values():
+        assert house.owner_id is not None, 'House {} has no owner'.format(house.id)
+        if house.family_owner:
+            owner = sim.families.get(house.owner_id)
+            assert owner is not None and house in owner.owned_houses, \
+                'House {} is not among the houses of its owner family {}'.format(house.id, house.owner_id)
+        else:
+            assert house.owner_id in sim.firms, 'House {} is owned by missing firm {}'.format(house.id, house.owner_id)
+        if house.family_id is not None:
+            family = sim.families.get(house.family_id)
+            assert family is not None and family.house is house, \
+                'House {} is occupied by family {}, that does not live there'.format(house.id, house.family_id)
+        assert house in sim.houses.owned_by(house.owner_id), 'House {} missing in the owners index'.format(house.id)
+
+    for family in sim.families.values():
+        for house in family.owned_houses:
+            assert house.owner_id == family.id, \
+                'Family {} owns house {} owned by {}'.format(family.id, house.id, house.owner_id)
+        if family.house is not None:
+            assert family.house.family_id == family.id, \
+                'Family {} lives in house {} occupied by {}'.format(family.id, family.house.id, family.house.family_id)
+
+
+def check_market(sim):
+    for house in sim.housing.for_sale:
+        assert house.family_id is None, 'House {} is listed for sale while occupied'.format(house.id)
+    vacant = set(h.id for h in sim.houses.values() if h.family_id is None and h.family_owner)
+    assert vacant == set(h.id for h in sim.housing.rental.vacancies), 'Vacancies for rent differ from houses'
+
+
+def check_population(sim):
+    reg_pops = Counter(agent.region_id for agent in sim.agents.values())
+    mun_pops = Counter()
+    for region_id, pop in reg_pops.items():
+        mun_pops[region_id[:7]] += pop
+    for counts, actual in [(sim.reg_pops, reg_pops), (sim.mun_pops, mun_pops)]:
+        wrong = {k: (counts.get(k, 0), actual[k]) for k in set(counts) | set(actual) if counts.get(k, 0) != actual[k]}
+        assert not wrong, 'Population counts differ from agents (count, agents): {}'.format(wrong)
+
+
+def check_unemployed(sim):
+    agents = sim.agents
+    low, high = agents.WORKING_AGES
+    age = agents.column('age')
+    rows = agents.rows((low < age) & (age < high) & (agents.column('firm') < 0))
+    assert set(rows.tolist()) == agents.unemployed, 'Unemployed pool differs from agents'
+
+
+def check_month(sim):
+    """Global checks at the end of the month"""
+    if enabled('full'):
+        check_ownership(sim)
+        check_market(sim)
+        check_population(sim)
+        check_unemployed(sim)
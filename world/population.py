@@ -4,6 +4,8 @@ import numpy as np
 import pandas as pd
 import statsmodels.api as sm
 
+from . import invariants
+
 
 def simplify_pops(pops, params):
     """Simplify population"""
@@ -85,6 +87,11 @@ def load_pops(mun_codes, params, year):
             row = [code] + row
             df.loc[df.shape[0]] = row
 
+    return prepare_pops(pops, params)
+
+
+def prepare_pops(pops, params):
+    """Count the total population and format (or simplify) the age groups"""
     for pop in pops.values():
         pop['code'] = pop['code'].astype(np.int64).astype(str)
 
@@ -127,10 +134,21 @@ class MarriageData:
                 for age in range(row.low, row.high + 1):
                     self.data[gender][age] = row.percentage
 
+        # Same probabilities as a (gender x age) array, where the last age stands for any age off the tables
+        n_ages = max(max(d) for d in self.data.values()) + 2
+        self.table = np.zeros((2, n_ages))
+        for i, gender in enumerate(['male', 'female']):
+            for age, p in self.data[gender].items():
+                self.table[i, age] = p
+
     def p_marriage(self, agent):
         # Probabilities in INPUT table have been adapted to allow marriage only of those 21 or older
         return self.data[agent.gender.lower()].get(agent.age, 0)
 
+    def p_marriage_of(self, male, ages):
+        """p_marriage of many agents at once, given boolean array `male` and their ages"""
+        return self.table[np.where(male, 0, 1), np.clip(ages, 0, self.table.shape[1] - 1)]
+
 
 pop_estimates = PopulationEstimates('input/estimativas_pop.csv')
 marriage_data = MarriageData()
@@ -140,9 +158,11 @@ def immigration(sim):
     """Adjust population for immigration"""
     year = sim.clock.year
 
+    estimates = pop_estimates if sim.geo.synthetic is None else sim.geo.synthetic
+
     # Create new agents for immigration
     for mun_code, pop in sim.mun_pops.items():
-        estimated_pop = pop_estimates.estimate_for_year(mun_code, year)
+        estimated_pop = estimates.estimate_for_year(mun_code, year)
         estimated_pop *= sim.PARAMS['PERCENTAGE_ACTUAL_POP']
         n_immigration = max(estimated_pop - pop, 0)
         n_immigration *= 1/12
@@ -189,13 +209,13 @@ def immigration(sim):
 
 def marriage(sim):
     """Adjust families for marriages"""
-    to_marry = []
-    for agent in sim.agents.values():
-        if sim.seed.random() < sim.PARAMS['MARRIAGE_CHECK_PROBABILITY']:
-            # Compute probability that this agent will marry
-            # NOTE we don't consider whether or not they are already married
-            if sim.seed.random() < agent.p_marriage:
-                to_marry.append(agent)
+    agents = sim.agents
+    rows = agents.rows()
+    rows = rows[sim.np_seed.random(len(rows)) < sim.PARAMS['MARRIAGE_CHECK_PROBABILITY']]
+    # Compute probability that these agents will marry
+    # NOTE we don't consider whether or not they are already married
+    rows = rows[sim.np_seed.random(len(rows)) < agents.p_marriage[rows]]
+    to_marry = [agents.views[r] for r in rows]
 
     # Marry individuals.
     # NOTE individuals are paired randomly
@@ -225,15 +245,16 @@ def marriage(sim):
                     old_b.add_agent(b)
                 else:
                     sim.families[new_family.id] = new_family
-                    a_region_id = a.family.region_id
-                    b_region_id = b.family.region_id
-                    sim.update_pop(a_region_id, a.region_id)
-                    sim.update_pop(b_region_id, b.region_id)
+                    # Moving in already counted them in the new region
+                    sim.update_pop(old_a.region_id, None)
+                    sim.update_pop(old_b.region_id, None)
 
             elif b_to_move_out:
+                sim.update_pop(b.region_id, a.region_id)
                 b.family.remove_agent(b)
                 a.family.add_agent(b)
             elif a_to_move_out:
+                sim.update_pop(a.region_id, b.region_id)
                 a.family.remove_agent(a)
                 b.family.add_agent(a)
             else:
@@ -251,12 +272,11 @@ def marriage(sim):
                 b.family.house.empty()
 
                 # Move out of existing rental
-                for house in sim.houses.values():
-                    if house.family_id == id:
-                        house.family_id = None
-                        house.rent_data = None
+                for house in sim.houses.occupied_by(id):
+                    house.family_id = None
+                    house.rent_data = None
 
-                sim.update_pop(old_r_id, b.region_id)
+                sim.update_pop(old_r_id, a.region_id, b.family.num_members)
                 for each in b.family.members.values():
                     a.family.add_agent(each)
 
@@ -267,5 +287,5 @@ def marriage(sim):
                     sim.central.loans[a.family.id] = loans
 
                 del sim.families[id]
-                unassigned_houses = [h for h in sim.houses.values() if h.owner_id == id]
-                assert len(unassigned_houses) == 0
+                if invariants.enabled('cheap'):
+                    assert not sim.houses.owned_by(id)
@@ -0,0 +1,68 @@
+import datetime
+from bisect import bisect_right
+from collections import defaultdict
+
+from dateutil import relativedelta
+
+from .clock import QUARTER_MONTHS
+
+
+class Scheduler:
+    """
+    Ordered calendar of simulation events.
+    The calendar is generated once from the starting day and the total number of days of the run.
+    Subsystems register handlers for each kind of event ('monthly', 'quarterly', 'yearly', ...) and the run
+    jumps straight from one event date to the next, instead of ticking through every single day.
+    """
+    def __init__(self, starting_day, total_days):
+        self.start = starting_day
+        self.end = starting_day + datetime.timedelta(days=total_days)
+        self.handlers = defaultdict(list)
+        self.calendar = self.build_calendar()
+
+    def build_calendar(self):
+        """List of (date, order, kind) for every first day of month within [start, end)"""
+        calendar = []
+        day = self.start.replace(day=1)
+        if day < self.start:
+            day += relativedelta.relativedelta(months=+1)
+        while day < self.end:
+            calendar.append((day, 0, 'monthly'))
+            if day.month in QUARTER_MONTHS:
+                calendar.append((day, 1, 'quarterly'))
+            if day.month == 1:
+                calendar.append((day, 2, 'yearly'))
+            day += relativedelta.relativedelta(months=+1)
+        return calendar
+
+    def add_event(self, day, kind, order=0):
+        """Add a one-off event to the calendar, such as a sub-monthly event.
+        Events on the same day run in increasing `order`. Ties run in insertion order"""
+        if not self.start <= day < self.end:
+            raise ValueError('Event {} on {} is outside of the simulation period'.format(kind, day))
+        position = bisect_right([(d, o) for d, o, _ in self.calendar], (day, order))
+        self.calendar.insert(position, (day, order, kind))
+
+    def register(self, kind, handler):
+        """Handlers are called, in registration order, every time an event of the given kind happens"""
+        self.handlers[kind].append(handler)
+
+    @property
+    def months(self):
+        """Dates of all monthly events"""
+        return [day for day, _, kind in self.calendar if kind == 'monthly']
+
+    def run(self, clock, after=None, until=None):
+        """Jump the clock from event to event, calling the registered handlers.
+        If `after` is given, only events strictly later than that date are run (e.g. when resuming a run).
+        If `until` is given, the run stops after the events of that date, leaving the clock on it"""
+        for day, _, kind in self.calendar:
+            if after is not None and day <= after:
+                continue
+            if until is not None and day > until:
+                return
+            clock.days = day
+            for handler in self.handlers[kind]:
+                handler()
+        # Leave the clock where the day-by-day loop used to finish
+        clock.days = self.end
@@ -0,0 +1,201 @@
+"""
+Made-up world for benchmarking, built without the IBGE shapefiles and tables.
+Municipalities are squares on a grid, each split into rectangular regions (APs) with
+an urban rectangle inside. Population, qualification, firms, IDHM, mortality, fertility,
+interest and FPM tables are generated in the same formats as the input files,
+so that the rest of the model runs unchanged at any given scale.
+"""
+import datetime
+import json
+import math
+
+import numpy as np
+import pandas as pd
+from shapely.geometry import box, mapping
+from shapely.ops import unary_union
+
+from .geography import STATES_CODES
+
+# Side of each municipality, in degrees
+MUN_SIDE = .1
+# Share of each side of a region that is left out of its urban area, at each end
+RURAL_MARGIN = .15
+# Yearly growth of population, firms and FPM
+POP_GROWTH = .015
+FIRMS_GROWTH = .035
+FPM_GROWTH = .05
+# Firms per inhabitant, as in the actual data
+FIRMS_PER_CAPITA = .018
+# FPM per inhabitant, per year
+FPM_PER_CAPITA = 15
+YEARS = range(2000, 2031)
+AGES = range(101)
+
+
+class SyntheticGeometry:
+    """The bits of OSGEO geometries that regions use"""
+    def __init__(self, polygon):
+        self.polygon = polygon
+
+    def GetEnvelope(self):
+        minx, miny, maxx, maxy = self.polygon.bounds
+        return minx, maxx, miny, maxy
+
+    def ExportToJson(self):
+        return json.dumps(mapping(self.polygon))
+
+
+class SyntheticShape:
+    """Stands for an OSGEO feature of the shapefiles"""
+    def __init__(self, id, polygon):
+        self.id = id
+        self._geometry = SyntheticGeometry(polygon)
+
+    def geometry(self):
+        return self._geometry
+
+
+class SyntheticWorld:
+    def __init__(self, spec, year):
+        """`spec` is conf.RUN['SYNTHETIC_WORLD']: number of MUNICIPALITIES, REGIONS_PER_MUNICIPALITY,
+        actual total POPULATION (scaled down by PERCENTAGE_ACTUAL_POP, as real data is), STATE and SEED"""
+        self.year = year
+        self.n_muns = spec.get('MUNICIPALITIES', 1)
+        self.regions_per_mun = spec.get('REGIONS_PER_MUNICIPALITY', 1)
+        self.population = spec.get('POPULATION', 100000)
+        self.state = spec.get('STATE', 'DF')
+        self.seed = spec.get('SEED', 0)
+        self.name = 'SYNTHETIC_{}x{}_{}_{}'.format(self.n_muns, self.regions_per_mun, self.population, self.seed)
+        rng = np.random.default_rng(self.seed)
+
+        # Codes follow the actual pattern: state number, then municipality, then AP
+        state_num = STATES_CODES.loc[STATES_CODES['codmun'] == self.state]['nummun'].iloc[0]
+        self.mun_codes = [int('{}9{:04d}'.format(state_num, i + 1)) for i in range(self.n_muns)]
+        self.mun_regions = {}
+        for mun_code in self.mun_codes:
+            if self.regions_per_mun == 1:
+                self.mun_regions[mun_code] = [str(mun_code)]
+            else:
+                self.mun_regions[mun_code] = ['{}001{:03d}'.format(mun_code, j + 1)
+                                              for j in range(self.regions_per_mun)]
+        self.region_ids = [r for regions in self.mun_regions.values() for r in regions]
+
+        # Actual population of each region, varying +-20% around the average
+        weights = rng.uniform(.8, 1.2, len(self.region_ids))
+        self.region_pops = dict(zip(self.region_ids, weights / weights.sum() * self.population))
+        self.mun_pops = {m: sum(self.region_pops[r] for r in regions) for m, regions in self.mun_regions.items()}
+        self.idhm_values = dict(zip(self.mun_codes, rng.uniform(.6, .85, self.n_muns).round(3)))
+        self.urban_shares = dict(zip(self.mun_codes, rng.uniform(.7, .95, self.n_muns).round(4)))
+        # Cumulative share of schooling levels, by region
+        self.schooling = {r: np.cumsum(rng.dirichlet(np.ones(5) * 4)) for r in self.region_ids}
+
+    def acps(self):
+        """ACP codes, ACP names and states, as geography.process_acps"""
+        return [self.name], [self.name], [self.state]
+
+    def names(self):
+        return pd.DataFrame({'cod_name': ['{} {}'.format(self.name, i + 1) for i in range(self.n_muns)],
+                             'cod_mun': self.mun_codes,
+                             'state': self.state})
+
+    def shapes(self):
+        """Urban areas by municipality and the shapes of the regions, as shapes.prepare_shapes"""
+        cols = math.ceil(math.sqrt(self.n_muns))
+        urban, shapes = {}, []
+        for i, mun_code in enumerate(self.mun_codes):
+            # Grid of municipalities around Brasília
+            x0 = -48 + (i % cols) * MUN_SIDE
+            y0 = -16 + (i // cols) * MUN_SIDE
+            width = MUN_SIDE / self.regions_per_mun
+            urban_parts = []
+            for j, region_id in enumerate(self.mun_regions[mun_code]):
+                minx, maxx = x0 + j * width, x0 + (j + 1) * width
+                shapes.append(SyntheticShape(region_id, box(minx, y0, maxx, y0 + MUN_SIDE)))
+                urban_parts.append(box(minx + width * RURAL_MARGIN, y0 + MUN_SIDE * RURAL_MARGIN,
+                                       maxx - width * RURAL_MARGIN, y0 + MUN_SIDE * (1 - RURAL_MARGIN)))
+            urban[str(mun_code)] = unary_union(urban_parts)
+        return urban, shapes
+
+    def single_ap_muns(self):
+        return [m for m, regions in self.mun_regions.items() if len(regions) == 1]
+
+    def prop_urban(self):
+        return pd.DataFrame({'cod_mun': self.mun_codes,
+                             str(self.year): [self.urban_shares[m] for m in self.mun_codes]})
+
+    def idhm(self):
+        return pd.DataFrame({'year': self.year, 'cod_mun': self.mun_codes,
+                             'idhm': [self.idhm_values[m] for m in self.mun_codes]})
+
+    def qualification(self):
+        """Cumulative shares of qualification by region, in the format of the year of the input files"""
+        if self.year == 2010:
+            # Degrees of instruction, see Generator.years_study
+            columns = ['1', '2', '3', '4', '5']
+        else:
+            # Years of study
+            columns = ['1', '4', '8', '11', '15']
+        quali = pd.DataFrame([self.schooling[r] for r in self.region_ids], columns=columns,
+                             index=pd.Index([int(r) for r in self.region_ids], name='code'))
+        # Make sure the last level is always reached
+        quali[columns[-1]] = 1.0
+        return quali
+
+    def pops(self):
+        """Population by region, gender and age, as read in population.load_pops"""
+        # Younger ages are more populous
+        ages = np.array(AGES)
+        by_age = np.exp(-ages / 35) * (ages < 95)
+        by_age /= by_age.sum()
+        pops = {}
+        for gender in ['male', 'female']:
+            rows = [[int(r)] + list(np.round(self.region_pops[r] / 2 * by_age).astype(int)) for r in self.region_ids]
+            pops[gender] = pd.DataFrame(rows, columns=['code'] + [str(a) for a in AGES])
+        return pops
+
+    def firms(self):
+        """Number of firms by region at the start and at the end of the period of FirmData"""
+        years = 10 if self.year == 2000 else 7
+        t0 = pd.DataFrame({'AP': [int(r) for r in self.region_ids],
+                           'num_firms': [int(round(self.region_pops[r] * FIRMS_PER_CAPITA))
+                                         for r in self.region_ids]})
+        t1 = t0.assign(num_firms=(t0.num_firms * (1 + FIRMS_GROWTH) ** years).round().astype(int))
+        return t0, t1
+
+    def estimate_for_year(self, mun_code, year):
+        """Population estimate, as population.PopulationEstimates"""
+        return round(self.mun_pops[int(mun_code)] * (1 + POP_GROWTH) ** (int(year) - self.year))
+
+    def mortality(self, gender):
+        """Yearly probability of death by age, with one column per year"""
+        ages = np.arange(111)
+        # Gompertz-Makeham, with infant mortality
+        p = np.minimum(1, .0005 + 5e-5 * np.exp(.09 * ages))
+        p[0] = .015
+        if gender == 'female':
+            p *= .6
+        return by_year(ages, p)
+
+    def fertility(self):
+        """Yearly probability of giving birth by age, between 15 and 49"""
+        ages = np.arange(15, 50)
+        return by_year(ages, .1 * np.exp(-((ages - 27) / 7) ** 2))
+
+    def interest(self):
+        """Fixed monthly interest and mortgage rates, as input/interest_fixed.csv"""
+        dates = [datetime.date(y, m, 1) for y in YEARS for m in range(1, 13)]
+        return pd.DataFrame({'date': [d.isoformat() for d in dates], 'interest': .002, 'mortgage': .004})
+
+    def fpm(self):
+        """Yearly FPM received by each municipality, as input/fpm/*.csv"""
+        return pd.DataFrame([{'ano': year, 'cod': m,
+                              'fpm': self.mun_pops[m] * FPM_PER_CAPITA * (1 + FPM_GROWTH) ** (year - YEARS[0])}
+                             for m in self.mun_codes for year in YEARS])
+
+
+def by_year(ages, p):
+    """Table with an 'age' column and the same probabilities for every year"""
+    table = pd.DataFrame({'age': ages})
+    for year in YEARS:
+        table[str(year)] = p
+    return table